@@ -1,11 +1,458 @@
 import tkinter as tk
 from tkinter import ttk
 import numpy as np
-from math import factorial
+from math import comb, sqrt
+from functools import lru_cache
+from collections import defaultdict
 
 CELL_SIZE = 20
 CANVAS_WIDTH = 800
 CANVAS_HEIGHT = 600
+POINT_SIZE = 3
+CURVE_SAMPLES = {'hermite': 50, 'bezier': 100, 'bspline': 100, 'nurbs': 100}
+ARC_LENGTH_SAMPLES = 1000
+LENGTH_MARK_STEP = 1.0  # Шаг меток вдоль кривой (в клетках)
+FIT_TOLERANCE = 0.3  # Допустимое отклонение аппроксимации штриха (в клетках)
+INTERSECTION_TOLERANCE = 1e-3
+INTERSECTION_MAX_PAIRS = 20000  # Предел пар частей на пару сегментов Безье
+INTERSECTION_MIN_OVERLAP = 0.1  # Более короткое наложение кривых считается касанием (в клетках)
+
+HERMITE_MATRIX = np.array([
+    [2, -2, 1, 1],
+    [-3, 3, -2, -1],
+    [0, 0, 1, 0],
+    [1, 0, 0, 0]
+])
+
+
+# Матрицы базисных функций кешируются: строки - значения параметра, столбцы - контрольные точки.
+# Вычисление кривой сводится к одному матричному умножению.
+@lru_cache(maxsize=128)
+def hermite_basis_matrix(samples):
+    t = np.linspace(0, 1, samples)
+    basis = np.column_stack([t ** 3, t ** 2, t, np.ones_like(t)]) @ HERMITE_MATRIX
+    basis.setflags(write=False)
+    return basis
+
+
+@lru_cache(maxsize=128)
+def bezier_basis_matrix(n, samples):
+    t = np.linspace(0, 1, samples)[:, None]
+    i = np.arange(n + 1)
+    binom = np.array([comb(n, k) for k in i], dtype=float)
+    basis = binom * t ** i * (1 - t) ** (n - i)
+    basis.setflags(write=False)
+    return basis
+
+
+@lru_cache(maxsize=128)
+def bspline_basis_matrix(knots, degree, samples):
+    # Векторизованная рекурсия Кокса - де Бура по всем значениям параметра сразу
+    knots = np.asarray(knots, dtype=float)
+    n = len(knots) - degree - 1
+    t = np.linspace(knots[degree], knots[n], samples)[:, None]
+
+    basis = ((knots[:-1] <= t) & (t < knots[1:])).astype(float)
+    if not basis[-1].any():
+        # Правый конец области (зажатый узловой вектор) относим к последнему непустому интервалу
+        basis[-1, np.nonzero(knots[:-1] < knots[n])[0][-1]] = 1.0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for k in range(1, degree + 1):
+            left_denom = knots[k:-1] - knots[:-k - 1]
+            right_denom = knots[k + 1:] - knots[1:-k]
+            left = np.where(left_denom > 0, (t - knots[:-k - 1]) / left_denom, 0.0)
+            right = np.where(right_denom > 0, (knots[k + 1:] - t) / right_denom, 0.0)
+            basis = left * basis[:, :-1] + right * basis[:, 1:]
+
+    basis.setflags(write=False)
+    return basis
+
+
+def make_knots(n, degree, kind='clamped'):
+    if kind == 'uniform':
+        return list(range(n + degree + 1))
+
+    # Открытый (зажатый) узловой вектор: кривая проходит через крайние контрольные точки
+    inner = n - degree - 1
+    return [0] * (degree + 1) + list(range(1, inner + 1)) + [inner + 1] * (degree + 1)
+
+
+def nurbs_circle(center, radius):
+    """Точная окружность: NURBS второй степени из 9 контрольных точек"""
+    cx, cy = center
+    offsets = [(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1), (1, 0)]
+    w = sqrt(2) / 2
+    return {
+        'type': 'nurbs',
+        'points': [(cx + dx * radius, cy + dy * radius) for dx, dy in offsets],
+        'weights': [1, w, 1, w, 1, w, 1, w, 1],
+        'knots': [0, 0, 0, 1, 1, 2, 2, 3, 3, 4, 4, 4],
+        'degree': 2
+    }
+
+
+def normalize(vector):
+    length = np.hypot(*vector)
+    return vector / length if length > 0 else vector
+
+
+def bezier_points(control, u):
+    # Точки кубической кривой Безье для массива параметров u
+    u = u[:, None]
+    return (((1 - u) ** 3) * control[0] + 3 * u * ((1 - u) ** 2) * control[1]
+            + 3 * (u ** 2) * (1 - u) * control[2] + (u ** 3) * control[3])
+
+
+def generate_bezier(points, u, tangent_left, tangent_right):
+    # МНК-подбор длин касательных при фиксированных концах и направлениях касательных
+    p0, p3 = points[0], points[-1]
+    b0, b1, b2, b3 = (1 - u) ** 3, 3 * u * (1 - u) ** 2, 3 * u ** 2 * (1 - u), u ** 3
+    a1 = b1[:, None] * tangent_left
+    a2 = b2[:, None] * tangent_right
+
+    c00 = np.sum(a1 * a1)
+    c01 = np.sum(a1 * a2)
+    c11 = np.sum(a2 * a2)
+    rest = points - (b0 + b1)[:, None] * p0 - (b2 + b3)[:, None] * p3
+    x0 = np.sum(a1 * rest)
+    x1 = np.sum(a2 * rest)
+
+    det = c00 * c11 - c01 * c01
+    alpha_left = (x0 * c11 - x1 * c01) / det if det != 0 else 0.0
+    alpha_right = (c00 * x1 - c01 * x0) / det if det != 0 else 0.0
+
+    # Вырожденный случай: эвристика Вуда - треть длины хорды
+    chord = np.hypot(*(p3 - p0))
+    if alpha_left < 1e-6 * chord or alpha_right < 1e-6 * chord:
+        alpha_left = alpha_right = chord / 3
+
+    return np.array([p0, p0 + alpha_left * tangent_left, p3 + alpha_right * tangent_right, p3])
+
+
+def reparameterize(control, points, u):
+    # Один шаг Ньютона - Рафсона: уточняем параметр ближайшей точки кривой
+    d1 = 3 * (control[1:] - control[:-1])
+    d2 = 2 * (d1[1:] - d1[:-1])
+    v = u[:, None]
+    q = bezier_points(control, u) - points
+    q1 = ((1 - v) ** 2) * d1[0] + 2 * v * (1 - v) * d1[1] + (v ** 2) * d1[2]
+    q2 = (1 - v) * d2[0] + v * d2[1]
+
+    numerator = np.sum(q * q1, axis=1)
+    denominator = np.sum(q1 * q1, axis=1) + np.sum(q * q2, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        step = np.where(denominator != 0, numerator / denominator, 0.0)
+    return u - step
+
+
+def fit_bezier_curve(points, tolerance=FIT_TOLERANCE, max_iterations=4):
+    """Аппроксимация ломаной кусочно-кубической кривой Безье (алгоритм Шнейдера)"""
+    points = np.asarray(points, dtype=float)
+    keep = np.concatenate(([True], np.any(np.diff(points, axis=0) != 0, axis=1)))
+    points = points[keep]
+    if len(points) < 2:
+        return []
+
+    segments = []
+    # Стек вместо рекурсии: правая половина кладется первой, чтобы сегменты шли по порядку
+    stack = [(0, len(points) - 1, normalize(points[1] - points[0]), normalize(points[-2] - points[-1]))]
+    while stack:
+        first, last, tangent_left, tangent_right = stack.pop()
+        part = points[first:last + 1]
+
+        if len(part) == 2:
+            chord = np.hypot(*(part[1] - part[0])) / 3
+            segments.append(np.array([part[0], part[0] + chord * tangent_left,
+                                      part[1] + chord * tangent_right, part[1]]))
+            continue
+
+        # Параметризация по длине хорды
+        chords = np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(part, axis=0).T))))
+        u = chords / chords[-1]
+
+        for iteration in range(max_iterations + 1):
+            control = generate_bezier(part, u, tangent_left, tangent_right)
+            errors = np.sum((bezier_points(control, u) - part) ** 2, axis=1)
+            split = int(np.argmax(errors[1:-1])) + 1
+            if errors[split] <= tolerance ** 2:
+                break
+            # Перепараметризация имеет смысл, только если ошибка не слишком велика
+            if errors[split] > (4 * tolerance) ** 2 or iteration == max_iterations:
+                control = None
+                break
+            u = reparameterize(control, part, u)
+
+        if control is not None:
+            segments.append(control)
+            continue
+
+        # Делим штрих в точке наибольшей ошибки
+        split += first
+        tangent_center = normalize(points[split - 1] - points[split + 1])
+        stack.append((split, last, -tangent_center, tangent_right))
+        stack.append((first, split, tangent_left, tangent_center))
+
+    return [[(float(x), float(y)) for x, y in control] for control in segments]
+
+
+def homogeneous(points, weights=None):
+    points = np.asarray(points, dtype=float)
+    weights = np.ones(len(points)) if weights is None else np.asarray(weights, dtype=float)
+    return np.column_stack([points * weights[:, None], weights])
+
+
+def insert_knot(control, knots, u, degree, side='right'):
+    # Вставка узла по Бёму; side='left' - для правого конца области (интервал слева от узла)
+    k = int(np.searchsorted(knots, u, side=side)) - 1
+    new = np.empty((len(control) + 1, control.shape[1]))
+    new[:k - degree + 1] = control[:k - degree + 1]
+    new[k + 1:] = control[k:]
+    for i in range(k - degree + 1, k + 1):
+        alpha = (u - knots[i]) / (knots[i + degree] - knots[i])
+        new[i] = alpha * control[i] + (1 - alpha) * control[i - 1]
+    return new, np.insert(knots, k + 1, u)
+
+
+def bspline_to_bezier(control, knots, degree):
+    # Доводим кратность каждого узла области до степени - получаем цепочку сегментов Безье
+    knots = np.asarray(knots, dtype=float)
+    start, end = knots[degree], knots[len(control)]
+    for u in np.unique(knots[(knots >= start) & (knots <= end)]):
+        while np.count_nonzero(knots == u) < degree:
+            control, knots = insert_knot(control, knots, u, degree, 'left' if u == end else 'right')
+
+    return [control[k - degree:k + 1] for k in range(degree, len(control))
+            if start <= knots[k] < knots[k + 1] <= end]
+
+
+def curve_to_bezier(curve):
+    """Сегменты Безье кривой в однородных координатах (x*w, y*w, w)"""
+    if curve['type'] == 'hermite':
+        (p0, p1), (t0, t1) = np.asarray(curve['points'], dtype=float), np.asarray(curve['tangents'], dtype=float)
+        return [homogeneous([p0, p0 + t0 / 3, p1 - t1 / 3, p1])]
+    elif curve['type'] == 'bezier':
+        return [homogeneous(curve['points'])]
+    elif curve['type'] == 'bspline':
+        knots = make_knots(len(curve['points']), 3, 'uniform')
+        return bspline_to_bezier(homogeneous(curve['points']), knots, 3)
+    elif curve['type'] == 'nurbs':
+        return bspline_to_bezier(homogeneous(curve['points'], curve['weights']), curve['knots'], curve['degree'])
+    return []
+
+
+def split_bezier(control):
+    # Деление сегмента пополам алгоритмом де Кастельжо
+    left, right = [control[0]], [control[-1]]
+    points = control
+    while len(points) > 1:
+        points = (points[:-1] + points[1:]) / 2
+        left.append(points[0])
+        right.append(points[-1])
+    return np.array(left), np.array(right[::-1])
+
+
+def chord_flat(points, tolerance):
+    # Контрольные точки отстоят от хорды не дальше tolerance: кривая - почти отрезок
+    chord = points[-1] - points[0]
+    length = np.hypot(*chord)
+    if length <= tolerance:
+        return False
+    offsets = chord[0] * (points[:, 1] - points[0, 1]) - chord[1] * (points[:, 0] - points[0, 0])
+    return np.abs(offsets).max() <= tolerance * length
+
+
+def chord_intersection(a0, a1, b0, b1, tolerance):
+    """Пересечение почти прямых участков по их хордам: ('point', p), ('overlap', (p, q)) или None"""
+    da, db = a1 - a0, b1 - b0
+    length_a = np.hypot(*da)
+    offset = b0 - a0
+    denominator = da[0] * db[1] - da[1] * db[0]
+    if abs(denominator) <= tolerance * np.hypot(*db) / 10:
+        # Параллельные хорды: наложение, если вторая лежит на прямой первой
+        if abs(da[0] * offset[1] - da[1] * offset[0]) > tolerance * length_a:
+            return None
+        s0, s1 = np.dot(offset, da) / length_a ** 2, np.dot(b1 - a0, da) / length_a ** 2
+        low, high = max(min(s0, s1), 0.0), min(max(s0, s1), 1.0)
+        if high < low:
+            return None
+        return 'overlap', (a0 + low * da, a0 + high * da)
+
+    t = (offset[0] * db[1] - offset[1] * db[0]) / denominator
+    u = (offset[0] * da[1] - offset[1] * da[0]) / denominator
+    slack_a, slack_b = tolerance / length_a, tolerance / np.hypot(*db)
+    if -slack_a <= t <= 1 + slack_a and -slack_b <= u <= 1 + slack_b:
+        return 'point', a0 + min(max(t, 0.0), 1.0) * da
+    return None
+
+
+def bezier_intersections(first, second, tolerance=INTERSECTION_TOLERANCE, max_depth=48,
+                         max_pairs=INTERSECTION_MAX_PAIRS):
+    """Пересечения двух сегментов Безье рекурсивным делением с отбрасыванием по габаритам
+
+    Возвращает (точки, участки наложения [(p, q)]). Почти прямые части сравниваются по хордам, поэтому
+    совпадающие участки кривых дают отрезки наложения, а не тысячи точек. После max_pairs
+    рассмотренных пар деление прекращается.
+    """
+    found, overlaps = [], []
+    stack = [(first, second, 0)]
+    pairs = 0
+    while stack and pairs < max_pairs:
+        a, b, depth = stack.pop()
+        pairs += 1
+        # Кривая лежит в выпуклой оболочке своих (спроецированных) контрольных точек
+        pa, pb = a[:, :2] / a[:, 2:], b[:, :2] / b[:, 2:]
+        low_a, high_a = pa.min(axis=0), pa.max(axis=0)
+        low_b, high_b = pb.min(axis=0), pb.max(axis=0)
+        if np.any(low_a > high_b + tolerance) or np.any(low_b > high_a + tolerance):
+            continue
+
+        size_a, size_b = (high_a - low_a).max(), (high_b - low_b).max()
+        if max(size_a, size_b) <= tolerance or depth >= max_depth:
+            found.append((np.maximum(low_a, low_b) + np.minimum(high_a, high_b)) / 2)
+        elif chord_flat(pa, tolerance / 10) and chord_flat(pb, tolerance / 10):
+            hit = chord_intersection(pa[0], pa[-1], pb[0], pb[-1], tolerance)
+            if hit is not None:
+                (found if hit[0] == 'point' else overlaps).append(hit[1])
+        elif size_a >= size_b:
+            stack.extend((part, b, depth + 1) for part in split_bezier(a))
+        else:
+            stack.extend((a, part, depth + 1) for part in split_bezier(b))
+
+    return found, overlaps
+
+
+def segments_intersections(first, second, eps=INTERSECTION_TOLERANCE * 10):
+    """Пересечения двух цепочек сегментов Безье: (точки, участки наложения) после склейки через merge_overlaps"""
+    points, overlaps = [], []
+    for a in first:
+        for b in second:
+            found, overlapping = bezier_intersections(a, b)
+            points.extend(found)
+            overlaps.extend(overlapping)
+    return merge_overlaps(points, overlaps, eps)
+
+
+def snap_points(points, eps):
+    """Склейка точек ближе eps: (представители, номер представителя для каждой точки)
+
+    Точка сравнивается только с представителями из соседних ячеек сетки с шагом eps.
+    """
+    cells = defaultdict(list)
+    result, labels = [], []
+    for point in np.asarray(points, dtype=float).reshape(-1, 2):
+        cx, cy = (int(c) for c in np.floor(point / eps))
+        label = next((k for dx in (-1, 0, 1) for dy in (-1, 0, 1) for k in cells.get((cx + dx, cy + dy), ())
+                      if np.hypot(*(point - result[k])) <= eps), None)
+        if label is None:
+            label = len(result)
+            result.append(point)
+            cells[(cx, cy)].append(label)
+        labels.append(label)
+    return result, labels
+
+
+def unique_points(points, eps):
+    return snap_points(points, eps)[0]
+
+
+def merge_overlaps(points, overlaps, eps, min_length=INTERSECTION_MIN_OVERLAP):
+    """Сборка кусков наложения в непрерывные участки
+
+    Возвращает (точки, участки): участок - массив кусков (K, 2, 2). Участок короче min_length
+    (касание кривых) заменяется одной точкой; точки на участках наложения отбрасываются.
+    """
+    if not overlaps:
+        return unique_points(points, eps), []
+
+    pieces = np.array(overlaps, dtype=float)
+    _, labels = snap_points(pieces.reshape(-1, 2), eps)
+    parent = list(range(len(labels)))
+
+    def find(k):
+        while parent[k] != k:
+            parent[k] = parent[parent[k]]
+            k = parent[k]
+        return k
+
+    # Куски с общим концом принадлежат одному участку
+    for start, end in zip(labels[::2], labels[1::2]):
+        parent[find(start)] = find(end)
+    groups = defaultdict(list)
+    for k, start in enumerate(labels[::2]):
+        groups[find(start)].append(k)
+
+    runs = []
+    points = list(points)
+    for members in groups.values():
+        run = pieces[members]
+        if np.hypot(*(run[:, 1] - run[:, 0]).T).sum() < min_length:
+            points.append(run.reshape(-1, 2).mean(axis=0))
+        else:
+            runs.append(run)
+
+    if runs and points:
+        # Расстояние от точек до ближайшего куска наложения
+        segments = np.concatenate(runs)
+        p = np.asarray(points, dtype=float)[:, None]
+        start, direction = segments[None, :, 0], segments[None, :, 1] - segments[None, :, 0]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.clip(np.nan_to_num(((p - start) * direction).sum(axis=2) / (direction ** 2).sum(axis=2)), 0, 1)
+        distance = np.hypot(*(start + t[..., None] * direction - p).transpose(2, 0, 1)).min(axis=1)
+        points = [point for point, d in zip(points, distance) if d > eps]
+    return unique_points(points, eps), runs
+
+
+class SpatialHash:
+    """Равномерная сетка (хеш по ячейкам) для поиска ближайшей точки"""
+
+    def __init__(self, cell_size=4):
+        self.cell_size = cell_size
+        self.cells = defaultdict(dict)  # ячейка -> ключи точек (dict сохраняет порядок вставки)
+        self.positions = {}
+
+    def cell_of(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def insert(self, key, x, y):
+        if key in self.positions:
+            self.move(key, x, y)
+            return
+        self.positions[key] = (x, y)
+        self.cells[self.cell_of(x, y)][key] = None
+
+    def move(self, key, x, y):
+        if self.cell_of(*self.positions[key]) == self.cell_of(x, y):
+            self.positions[key] = (x, y)
+        else:
+            self.remove(key)
+            self.insert(key, x, y)
+
+    def remove(self, key):
+        cell = self.cell_of(*self.positions.pop(key))
+        del self.cells[cell][key]
+        if not self.cells[cell]:
+            del self.cells[cell]
+
+    def clear(self):
+        self.cells.clear()
+        self.positions.clear()
+
+    def nearest(self, x, y, threshold):
+        # Просматриваем только ячейки, пересекающие квадрат поиска
+        cx0, cy0 = self.cell_of(x - threshold, y - threshold)
+        cx1, cy1 = self.cell_of(x + threshold, y + threshold)
+
+        best_key, best_dist = None, None
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                for key in self.cells.get((cx, cy), ()):
+                    px, py = self.positions[key]
+                    if abs(px - x) <= threshold and abs(py - y) <= threshold:
+                        dist = (px - x) ** 2 + (py - y) ** 2
+                        if best_dist is None or dist < best_dist:
+                            best_key, best_dist = key, dist
+        return best_key
 
 
 class ParametricCurvesEditor:
@@ -17,7 +464,13 @@ class ParametricCurvesEditor:
         self.curve_type = tk.StringVar(value='hermite')
         self.edit_mode = tk.BooleanVar(value=False)
         self.points = []
+        self.weights = []  # Веса добавляемых точек NURBS
+        self.weight = tk.DoubleVar(value=1.0)
         self.curves = []
+        self.curve_items = []  # Элементы холста каждой кривой (индексы как в self.curves)
+        self.point_index = SpatialHash()  # (индекс кривой, ключ точки) -> координаты
+        self.intersections = {}  # (i, j) -> точки пересечения кривых i и j
+        self.line_points = []  # Концы отрезка для пересечения с кривыми
         self.current_curve = None
         self.selected_point = None
         self.preview_id = None
@@ -42,14 +495,23 @@ class ParametricCurvesEditor:
 
         # Меню выбора кривой
         curve_menu = ttk.OptionMenu(toolbar, self.curve_type, 'hermite',
-                                    'hermite', 'bezier', 'bspline',
+                                    'hermite', 'bezier', 'bspline', 'nurbs', 'freehand',
                                     command=self.update_curve_type)
         curve_menu.pack(side=tk.LEFT, padx=5)
 
+        # Вес следующей точки NURBS
+        ttk.Label(toolbar, text='Вес:').pack(side=tk.LEFT)
+        ttk.Spinbox(toolbar, from_=0.1, to=10, increment=0.1, width=5,
+                    textvariable=self.weight).pack(side=tk.LEFT, padx=5)
+        ttk.Button(toolbar, text='NURBS-окружность', command=self.add_nurbs_circle).pack(side=tk.LEFT, padx=5)
+
         # Кнопки управления
         ttk.Checkbutton(toolbar, text='Режим редактирования', variable=self.edit_mode).pack(side=tk.LEFT, padx=5)
         ttk.Button(toolbar, text='Очистить', command=self.clear_canvas).pack(side=tk.LEFT, padx=5)
         ttk.Button(toolbar, text='Соединить кривые', command=self.connect_curves).pack(side=tk.LEFT, padx=5)
+        ttk.Button(toolbar, text='Пересечения', command=self.show_intersections).pack(side=tk.LEFT, padx=5)
+        ttk.Button(toolbar, text='Пересечение с отрезком', command=self.intersect_with_line).pack(side=tk.LEFT, padx=5)
+        ttk.Button(toolbar, text='Длина', command=self.show_length_marks).pack(side=tk.LEFT, padx=5)
 
         # Холст для рисования
         self.canvas = tk.Canvas(self.root, width=CANVAS_WIDTH, height=CANVAS_HEIGHT, bg='white')
@@ -62,6 +524,7 @@ class ParametricCurvesEditor:
     def update_curve_type(self, *args):
         self.clear_preview()
         self.points = []
+        self.weights = []
         self.tangent_mode = False
         self.status.config(text=f"Выбран тип кривой: {self.curve_type.get()}")
 
@@ -80,11 +543,16 @@ class ParametricCurvesEditor:
             if self.selected_point:
                 return
 
+        if self.curve_type.get() == 'freehand':
+            # Штрих запоминаем с дробными координатами, без привязки к сетке
+            self.points = [(event.x / CELL_SIZE, event.y / CELL_SIZE)]
+            return
+
         if self.curve_type.get() == 'hermite':
             if not self.tangent_mode:
                 if len(self.points) < 2:
                     self.points.append((x, y))
-                    self.draw_point(x, y)
+                    self.draw_point(x, y, tags='pending')
 
                     if len(self.points) == 1:
                         self.status.config(text="Укажите конечную точку")
@@ -98,16 +566,26 @@ class ParametricCurvesEditor:
                         self.tangent_mode = True
             return
 
-        # Для Безье и B-сплайнов просто добавляем точки
+        # Для Безье, B-сплайнов и NURBS просто добавляем точки
         self.points.append((x, y))
-        self.draw_point(x, y, color='red' if len(self.points) in (1, 4) else 'green')
+        if self.curve_type.get() == 'nurbs':
+            self.weights.append(self.weight.get())
+        self.draw_point(x, y, color='red' if len(self.points) in (1, 4) else 'green', tags='pending')
 
         if self.curve_type.get() == 'bezier' and len(self.points) >= 4:
             self.finalize_bezier_curve()
         elif self.curve_type.get() == 'bspline' and len(self.points) >= 4:
             self.finalize_bspline()
+        elif self.curve_type.get() == 'nurbs' and len(self.points) >= 4:
+            self.finalize_nurbs()
 
     def on_drag(self, event):
+        if not self.edit_mode.get() and self.curve_type.get() == 'freehand' and self.points:
+            x0, y0 = self.points[-1]
+            self.points.append((event.x / CELL_SIZE, event.y / CELL_SIZE))
+            self.draw_line(x0, y0, *self.points[-1], preview=True)
+            return
+
         if not self.edit_mode.get() or not self.selected_point:
             return
 
@@ -128,7 +606,12 @@ class ParametricCurvesEditor:
             p1 = curve['points'][1]
             curve['tangents'][1] = ((x - p1[0]) * 3, (y - p1[1]) * 3)
 
-        self.redraw_all_curves()
+        # Таблица длины дуги и пересечения устарели, пересчитываем только перемещаемую кривую
+        curve.pop('arc_length', None)
+        self.canvas.delete('length_mark')
+        self.invalidate_intersections(curve_idx)
+        self.index_curve(curve_idx)
+        self.update_curve_items(curve_idx)
 
     def on_motion(self, event):
         if self.edit_mode.get() or not self.points:
@@ -160,12 +643,22 @@ class ParametricCurvesEditor:
             control_points = self.points + [(x, y)]
             if len(control_points) >= 4:
                 self.preview_id = self.draw_bspline(control_points, preview=True)
+        elif self.curve_type.get() == 'nurbs' and len(self.points) >= 1:
+            control_points = self.points + [(x, y)]
+            if len(control_points) >= 4:
+                weights = self.weights + [self.weight.get()]
+                points = self.evaluate_nurbs(control_points, weights, make_knots(len(control_points), 3))
+                self.preview_id = self.draw_curve(points, preview=True)
 
     def on_release(self, event):
         if self.edit_mode.get():
             self.selected_point = None
             return
 
+        if self.curve_type.get() == 'freehand' and self.points:
+            self.finalize_stroke()
+            return
+
         if not self.points or self.curve_type.get() != 'hermite':
             return
 
@@ -183,10 +676,8 @@ class ParametricCurvesEditor:
                 self.current_curve['tangents'].append(t1)
 
                 # Финализируем кривую
-                self.curves.append(self.current_curve)
-                self.draw_hermite(self.points[0], self.points[1],
-                                  self.current_curve['tangents'][0],
-                                  self.current_curve['tangents'][1])
+                self.canvas.delete('pending')
+                self.add_curve(self.current_curve)
 
                 self.points = []
                 self.current_curve = None
@@ -200,8 +691,8 @@ class ParametricCurvesEditor:
             'type': 'bezier',
             'points': self.points.copy()
         }
-        self.curves.append(self.current_curve)
-        self.draw_bezier(self.points)
+        self.canvas.delete('pending')
+        self.add_curve(self.current_curve)
         self.points = []
         self.current_curve = None
         self.status.config(text="Кривая Безье построена. Готов к работе")
@@ -211,47 +702,73 @@ class ParametricCurvesEditor:
             'type': 'bspline',
             'points': self.points.copy()
         }
-        self.curves.append(self.current_curve)
-        self.draw_bspline(self.points)
+        self.canvas.delete('pending')
+        self.add_curve(self.current_curve)
         self.points = []
         self.current_curve = None
         self.status.config(text="B-сплайн построен. Готов к работе")
 
+    def finalize_nurbs(self, degree=3):
+        self.current_curve = {
+            'type': 'nurbs',
+            'points': self.points.copy(),
+            'weights': self.weights.copy(),
+            'knots': make_knots(len(self.points), degree),
+            'degree': degree
+        }
+        self.canvas.delete('pending')
+        self.add_curve(self.current_curve)
+        self.points = []
+        self.weights = []
+        self.current_curve = None
+        self.status.config(text="NURBS-кривая построена. Готов к работе")
+
+    def finalize_stroke(self):
+        # Плотный штрих заменяем несколькими кубическими кривыми Безье
+        segments = fit_bezier_curve(self.points)
+        self.clear_preview()
+        for control_points in segments:
+            self.add_curve({'type': 'bezier', 'points': control_points})
+
+        self.status.config(text=f"Штрих из {len(self.points)} точек заменен "
+                                f"{len(segments)} сегментами Безье. Готов к работе")
+        self.points = []
+
+    def add_nurbs_circle(self):
+        center = (CANVAS_WIDTH // CELL_SIZE // 2, CANVAS_HEIGHT // CELL_SIZE // 2)
+        self.add_curve(nurbs_circle(center, 5))
+        self.status.config(text="Окружность NURBS построена. Готов к работе")
+
+    def add_curve(self, curve):
+        self.curves.append(curve)
+        self.curve_items.append(self.create_curve_items(curve))
+        self.index_curve(len(self.curves) - 1)
+
+    def index_curve(self, curve_idx):
+        # Обновляем положение всех перетаскиваемых точек кривой в пространственном индексе
+        curve = self.curves[curve_idx]
+        keys = list(range(len(curve['points'])))
+        if curve['type'] == 'hermite':
+            keys += ['tangent_0', 'tangent_1']  # Синие точки касательных
+
+        points, _ = self.curve_handles(curve)
+        for key, (x, y, _) in zip(keys, points):
+            self.point_index.insert((curve_idx, key), x, y)
+
     def find_nearest_point(self, x, y, threshold=2):
-        # Поиск обычных точек (как было)
-        for curve_idx, curve in enumerate(self.curves):
-            for point_idx, (px, py) in enumerate(curve['points']):
-                if abs(px - x) <= threshold and abs(py - y) <= threshold:
-                    return (curve_idx, point_idx)
-
-        # ДОБАВЛЯЕМ: Поиск синих точек касательных (только для Эрмита)
-        for curve_idx, curve in enumerate(self.curves):
-            if curve['type'] == 'hermite' and 'tangents' in curve:
-                p0, p1 = curve['points']
-                t0, t1 = curve['tangents']
-
-                # Проверяем первую касательную (возле p0)
-                tangent_x = p0[0] + t0[0] / 3
-                tangent_y = p0[1] + t0[1] / 3
-                if abs(tangent_x - x) <= threshold and abs(tangent_y - y) <= threshold:
-                    return (curve_idx, 'tangent_0')  # Возвращаем спец.ключ
-
-                # Проверяем вторую касательную (возле p1)
-                tangent_x = p1[0] + t1[0] / 3
-                tangent_y = p1[1] + t1[1] / 3
-                if abs(tangent_x - x) <= threshold and abs(tangent_y - y) <= threshold:
-                    return (curve_idx, 'tangent_1')
-
-        return None
+        # Возвращает (индекс кривой, номер точки или 'tangent_0'/'tangent_1')
+        return self.point_index.nearest(x, y, threshold)
 
     def draw_point(self, x, y, color='red', tags=None):
-        size = 3
-        self.canvas.create_oval(
-            (x * CELL_SIZE) - size, (y * CELL_SIZE) - size,
-            (x * CELL_SIZE) + size, (y * CELL_SIZE) + size,
+        return self.canvas.create_oval(
+            *self.point_coords(x, y),
             fill=color, outline=color, tags=tags
         )
 
+    def point_coords(self, x, y):
+        return ((x * CELL_SIZE) - POINT_SIZE, (y * CELL_SIZE) - POINT_SIZE,
+                (x * CELL_SIZE) + POINT_SIZE, (y * CELL_SIZE) + POINT_SIZE)
+
     def draw_line(self, x0, y0, x1, y1, color='black', dash=None, preview=False, tags=None):
         return self.canvas.create_line(
             x0 * CELL_SIZE, y0 * CELL_SIZE,
@@ -261,129 +778,248 @@ class ParametricCurvesEditor:
             tags='preview' if preview else tags
         )
 
-    def draw_curve(self, points, color='black', dash=None, preview=False, tags=None):
+    def scale_points(self, points):
         scaled = []
         for x, y in points:
             scaled.extend([x * CELL_SIZE, y * CELL_SIZE])
+        return scaled
 
-        return self.canvas.create_line(*scaled,
+    def draw_curve(self, points, color='black', dash=None, preview=False, tags=None):
+        return self.canvas.create_line(*self.scale_points(points),
                                        fill='gray' if preview else color,
                                        dash=(2, 2) if preview else dash,
                                        tags='preview' if preview else tags,
                                        smooth=True)
 
-    def draw_hermite(self, p0, p1, t0, t1, preview=False):
-        # Матрица Эрмита
-        hermite_matrix = np.array([
-            [2, -2, 1, 1],
-            [-3, 3, -2, -1],
-            [0, 0, 1, 0],
-            [1, 0, 0, 0]
-        ])
-
+    def evaluate_hermite(self, p0, p1, t0, t1, samples=CURVE_SAMPLES['hermite']):
         # Вектор параметров
         geometry_vector = np.array([
             [p0[0], p0[1]],
             [p1[0], p1[1]],
             [t0[0], t0[1]],
             [t1[0], t1[1]]
-        ])
+        ], dtype=float)
 
-        # Вычисляем коэффициенты
-        coefficients = np.dot(hermite_matrix, geometry_vector)
+        points = hermite_basis_matrix(samples) @ geometry_vector
+        return list(map(tuple, points))
 
-        # Генерируем точки кривой
-        points = []
-        for t in np.linspace(0, 1, 50):
-            t_vector = np.array([t ** 3, t ** 2, t, 1])
-            point = np.dot(t_vector, coefficients)
-            points.append((point[0], point[1]))
+    def evaluate_bezier(self, control_points, samples=CURVE_SAMPLES['bezier']):
+        n = len(control_points) - 1
+        points = bezier_basis_matrix(n, samples) @ np.asarray(control_points, dtype=float)
+        return list(map(tuple, points))
 
-        # Рисуем кривую
-        curve_id = self.draw_curve(points, preview=preview)
+    def evaluate_bspline(self, control_points, degree=3, samples=CURVE_SAMPLES['bspline']):
+        n = len(control_points)
+        if n < degree + 1:
+            return None
 
-        # Рисуем контрольные элементы
-        if not preview:
-            self.draw_point(p0[0], p0[1], color='red')
-            self.draw_point(p1[0], p1[1], color='red')
+        # Равномерный узловой вектор
+        knots = tuple(make_knots(n, degree, 'uniform'))
+        points = bspline_basis_matrix(knots, degree, samples) @ np.asarray(control_points, dtype=float)
+        return list(map(tuple, points))
 
-            # Касательные
-            self.draw_line(p0[0], p0[1], p0[0] + t0[0] / 3, p0[1] + t0[1] / 3, color='blue', dash=(2, 2))
-            self.draw_line(p1[0], p1[1], p1[0] + t1[0] / 3, p1[1] + t1[1] / 3, color='blue', dash=(2, 2))
+    def evaluate_nurbs(self, control_points, weights, knots, degree=3, samples=CURVE_SAMPLES['nurbs']):
+        if len(control_points) < degree + 1:
+            return None
 
-            # Точки касательных
-            self.draw_point(p0[0] + t0[0] / 3, p0[1] + t0[1] / 3, color='blue')
-            self.draw_point(p1[0] + t1[0] / 3, p1[1] + t1[1] / 3, color='blue')
+        # Вычисляем в однородных координатах (w*x, w*y, w), затем делим на w
+        points = bspline_basis_matrix(tuple(knots), degree, samples) @ homogeneous(control_points, weights)
+        return list(map(tuple, points[:, :2] / points[:, 2:]))
 
-        return curve_id
+    def draw_hermite(self, p0, p1, t0, t1, preview=False):
+        return self.draw_curve(self.evaluate_hermite(p0, p1, t0, t1), preview=preview)
 
     def draw_bezier(self, control_points, preview=False):
-        n = len(control_points) - 1
-        points = []
-
-        for t in np.linspace(0, 1, 100):
-            x, y = 0, 0
-            for i in range(n + 1):
-                basis = self.bernstein_basis(n, i, t)
-                x += control_points[i][0] * basis
-                y += control_points[i][1] * basis
-            points.append((x, y))
-
-        # Рисуем кривую
-        curve_id = self.draw_curve(points, preview=preview)
-
-        # Рисуем контрольные точки и ломаную
-        if not preview:
-            for i, (x, y) in enumerate(control_points):
-                color = 'red' if i in (0, len(control_points) - 1) else 'green'
-                self.draw_point(x, y, color=color)
-            self.draw_control_polygon(control_points)
-
-        return curve_id
+        return self.draw_curve(self.evaluate_bezier(control_points), preview=preview)
 
     def draw_bspline(self, control_points, preview=False, degree=3):
-        n = len(control_points)
-        if n < degree + 1:
+        points = self.evaluate_bspline(control_points, degree)
+        if points is None:
             return None
-
-        # Равномерный узловой вектор
-        knots = list(range(n + degree + 1))
-
+        return self.draw_curve(points, preview=preview)
+
+    def evaluate_curve(self, curve, samples=None):
+        samples = samples or CURVE_SAMPLES[curve['type']]
+        if curve['type'] == 'hermite':
+            p0, p1 = curve['points']
+            t0, t1 = curve['tangents']
+            return self.evaluate_hermite(p0, p1, t0, t1, samples=samples)
+        elif curve['type'] == 'bezier':
+            return self.evaluate_bezier(curve['points'], samples=samples)
+        elif curve['type'] == 'bspline':
+            return self.evaluate_bspline(curve['points'], samples=samples)
+        elif curve['type'] == 'nurbs':
+            return self.evaluate_nurbs(curve['points'], curve['weights'], curve['knots'],
+                                       curve['degree'], samples=samples)
+
+    def arc_length_table(self, curve):
+        # Накопленная длина дуги по плотной выборке; строится один раз и хранится в кривой
+        if 'arc_length' not in curve:
+            points = np.array(self.evaluate_curve(curve, ARC_LENGTH_SAMPLES), dtype=float)
+            segments = np.hypot(*np.diff(points, axis=0).T)
+            lengths = np.concatenate(([0.0], np.cumsum(segments)))
+            curve['arc_length'] = (lengths, points)
+        return curve['arc_length']
+
+    def curve_length(self, curve):
+        lengths, _ = self.arc_length_table(curve)
+        return lengths[-1]
+
+    def point_at_distance(self, curve, distance):
+        lengths, points = self.arc_length_table(curve)
+        distance = min(max(distance, 0.0), lengths[-1])
+
+        # Бинарный поиск отрезка таблицы, содержащего нужную длину
+        i = int(np.searchsorted(lengths, distance, side='right')) - 1
+        if i >= len(lengths) - 1:
+            return tuple(points[-1])
+
+        segment = lengths[i + 1] - lengths[i]
+        alpha = 0.0 if segment == 0 else (distance - lengths[i]) / segment
+        x, y = points[i] + alpha * (points[i + 1] - points[i])
+        return (x, y)
+
+    def point_at_fraction(self, curve, fraction):
+        # Например, fraction=0.4 - точка на 40% длины кривой
+        return self.point_at_distance(curve, fraction * self.curve_length(curve))
+
+    def resample_by_length(self, curve, step):
+        # Точки через равные расстояния вдоль кривой, начиная с ее начала
+        lengths, points = self.arc_length_table(curve)
+        targets = np.arange(0, lengths[-1] + 1e-9, step)
+        xs = np.interp(targets, lengths, points[:, 0])
+        ys = np.interp(targets, lengths, points[:, 1])
+        return list(zip(xs, ys))
+
+    def curve_handles(self, curve):
+        """Контрольные точки [(x, y, цвет)] и линии [(x0, y0, x1, y1)] кривой"""
+        if curve['type'] == 'hermite':
+            p0, p1 = curve['points']
+            t0, t1 = curve['tangents']
+            h0 = (p0[0] + t0[0] / 3, p0[1] + t0[1] / 3)
+            h1 = (p1[0] + t1[0] / 3, p1[1] + t1[1] / 3)
+
+            points = [(*p0, 'red'), (*p1, 'red'), (*h0, 'blue'), (*h1, 'blue')]
+            lines = [(*p0, *h0), (*p1, *h1)]
+            return points, lines
+
+        control_points = curve['points']
         points = []
-        for t in np.linspace(degree, n, 100):
-            x, y = 0, 0
-            for i in range(n):
-                basis = self.bspline_basis(i, degree, t, knots)
-                x += control_points[i][0] * basis
-                y += control_points[i][1] * basis
-            points.append((x, y))
-
-        # Рисуем кривую
-        curve_id = self.draw_curve(points, preview=preview)
-
-        # Рисуем контрольные точки и ломаную
-        if not preview:
-            for x, y in control_points:
-                self.draw_point(x, y, color='green')
-            self.draw_control_polygon(control_points)
+        for i, (x, y) in enumerate(control_points):
+            if curve['type'] == 'bezier' and i in (0, len(control_points) - 1):
+                points.append((x, y, 'red'))
+            else:
+                points.append((x, y, 'green'))
+
+        lines = [(*control_points[i], *control_points[i + 1]) for i in range(len(control_points) - 1)]
+        return points, lines
+
+    def curve_intersections(self, i, j):
+        # (точки, участки наложения); результат кешируется для пары кривых до редактирования одной из них
+        key = (min(i, j), max(i, j))
+        if key not in self.intersections:
+            points, runs = segments_intersections(curve_to_bezier(self.curves[i]), curve_to_bezier(self.curves[j]))
+            self.intersections[key] = ([tuple(p) for p in points], runs)
+        return self.intersections[key]
+
+    def line_intersections(self, curve_idx, p, q):
+        # Отрезок p-q - сегмент Безье первой степени
+        points, runs = segments_intersections(curve_to_bezier(self.curves[curve_idx]), [homogeneous([p, q])])
+        return [tuple(point) for point in points], runs
+
+    def invalidate_intersections(self, curve_idx):
+        self.canvas.delete('intersection')
+        for key in [key for key in self.intersections if curve_idx in key]:
+            del self.intersections[key]
+
+    def draw_intersections(self, points, runs):
+        for x, y in points:
+            self.draw_point(x, y, color='orange', tags='intersection')
+        for run in runs:
+            for (x0, y0), (x1, y1) in run:
+                self.draw_line(x0, y0, x1, y1, color='orange', tags='intersection')
+
+    def report_intersections(self, count, overlap_count):
+        text = f"Найдено точек пересечения: {count}"
+        if overlap_count:
+            text += f", участков наложения: {overlap_count}"
+        self.status.config(text=text)
+
+    def show_intersections(self):
+        self.canvas.delete('intersection')
+        count = overlap_count = 0
+        for i in range(len(self.curves)):
+            for j in range(i + 1, len(self.curves)):
+                points, runs = self.curve_intersections(i, j)
+                self.draw_intersections(points, runs)
+                count += len(points)
+                overlap_count += len(runs)
+        self.report_intersections(count, overlap_count)
+
+    def intersect_with_line(self):
+        if not self.curves:
+            self.status.config(text="Нет кривых")
+            return
 
-        return curve_id
+        self.canvas.delete('intersection')
+        self.line_points = []
+        self.status.config(text="Укажите начало и конец отрезка")
+        self.canvas.bind('<Button-1>', self.line_point_click)
 
-    def bernstein_basis(self, n, i, t):
-        binom = factorial(n) / (factorial(i) * factorial(n - i))
-        return binom * (t ** i) * ((1 - t) ** (n - i))
+    def line_point_click(self, event):
+        x, y = event.x // CELL_SIZE, event.y // CELL_SIZE
+        self.line_points.append((x, y))
+        self.draw_point(x, y, color='purple', tags='intersection')
+        if len(self.line_points) < 2:
+            return
 
-    def bspline_basis(self, i, k, t, knots):
-        if k == 0:
-            return 1 if knots[i] <= t < knots[i + 1] else 0
+        self.canvas.bind('<Button-1>', self.on_click)
+        p, q = self.line_points
+        self.draw_line(*p, *q, color='purple', tags='intersection')
+        count = overlap_count = 0
+        for curve_idx in range(len(self.curves)):
+            points, runs = self.line_intersections(curve_idx, p, q)
+            self.draw_intersections(points, runs)
+            count += len(points)
+            overlap_count += len(runs)
+        self.report_intersections(count, overlap_count)
+        self.line_points = []
+
+    def show_length_marks(self):
+        # Длины кривых, метки через LENGTH_MARK_STEP клеток вдоль каждой и середина по длине
+        self.canvas.delete('length_mark')
+        if not self.curves:
+            self.status.config(text="Нет кривых")
+            return
 
-        denom1 = knots[i + k] - knots[i]
-        term1 = 0 if denom1 == 0 else ((t - knots[i]) / denom1) * self.bspline_basis(i, k - 1, t, knots)
+        lengths = []
+        for curve in self.curves:
+            lengths.append(self.curve_length(curve))
+            for x, y in self.resample_by_length(curve, LENGTH_MARK_STEP):
+                self.draw_point(x, y, color='purple', tags='length_mark')
+            self.draw_point(*self.point_at_fraction(curve, 0.5), color='orange', tags='length_mark')
+        self.status.config(text="Длины кривых (клеток): " + ', '.join(f"{length:.2f}" for length in lengths))
+
+    def create_curve_items(self, curve):
+        points, lines = self.curve_handles(curve)
+        return {
+            'curve': self.draw_curve(self.evaluate_curve(curve)),
+            'lines': [self.draw_line(x0, y0, x1, y1, color='blue', dash=(2, 2), tags='control')
+                      for x0, y0, x1, y1 in lines],
+            'points': [self.draw_point(x, y, color=color) for x, y, color in points]
+        }
 
-        denom2 = knots[i + k + 1] - knots[i + 1]
-        term2 = 0 if denom2 == 0 else ((knots[i + k + 1] - t) / denom2) * self.bspline_basis(i + 1, k - 1, t, knots)
+    def update_curve_items(self, curve_idx):
+        # Обновляем координаты существующих элементов вместо их пересоздания
+        curve = self.curves[curve_idx]
+        items = self.curve_items[curve_idx]
+        points, lines = self.curve_handles(curve)
 
-        return term1 + term2
+        self.canvas.coords(items['curve'], *self.scale_points(self.evaluate_curve(curve)))
+        for item, (x0, y0, x1, y1) in zip(items['lines'], lines):
+            self.canvas.coords(item, x0 * CELL_SIZE, y0 * CELL_SIZE, x1 * CELL_SIZE, y1 * CELL_SIZE)
+        for item, (x, y, _) in zip(items['points'], points):
+            self.canvas.coords(item, *self.point_coords(x, y))
 
     def draw_control_polygon(self, points, preview=False):
         for i in range(len(points) - 1):
@@ -398,20 +1034,6 @@ class ParametricCurvesEditor:
             self.preview_id = None
         self.canvas.delete('preview')
 
-    def redraw_all_curves(self):
-        self.canvas.delete('all')
-        self.draw_grid()
-
-        for curve in self.curves:
-            if curve['type'] == 'hermite':
-                p0, p1 = curve['points']
-                t0, t1 = curve['tangents']
-                self.draw_hermite(p0, p1, t0, t1)
-            elif curve['type'] == 'bezier':
-                self.draw_bezier(curve['points'])
-            elif curve['type'] == 'bspline':
-                self.draw_bspline(curve['points'])
-
     def connect_curves(self):
         if len(self.curves) < 2:
             self.status.config(text="Недостаточно кривых для соединения")
@@ -440,8 +1062,7 @@ class ParametricCurvesEditor:
                 'points': [p0, p1],
                 'tangents': [t0, t1]
             }
-            self.curves.append(new_curve)
-            self.redraw_all_curves()
+            self.add_curve(new_curve)
             self.status.config(text="Кривые Эрмита соединены")
 
         elif curve1['type'] == 'bezier':
@@ -459,8 +1080,7 @@ class ParametricCurvesEditor:
                 'type': 'bezier',
                 'points': new_points
             }
-            self.curves.append(new_curve)
-            self.redraw_all_curves()
+            self.add_curve(new_curve)
             self.status.config(text="Кривые Безье соединены")
 
         elif curve1['type'] == 'bspline':
@@ -474,14 +1094,32 @@ class ParametricCurvesEditor:
                 'type': 'bspline',
                 'points': new_points
             }
-            self.curves.append(new_curve)
-            self.redraw_all_curves()
+            self.add_curve(new_curve)
             self.status.config(text="B-сплайны соединены")
 
+        elif curve1['type'] == 'nurbs':
+            # Объединяем точки и веса, узловой вектор строим заново
+            new_points = curve1['points'] + curve2['points']
+            degree = min(curve1['degree'], curve2['degree'])
+
+            new_curve = {
+                'type': 'nurbs',
+                'points': new_points,
+                'weights': curve1['weights'] + curve2['weights'],
+                'knots': make_knots(len(new_points), degree),
+                'degree': degree
+            }
+            self.add_curve(new_curve)
+            self.status.config(text="NURBS-кривые соединены")
+
     def clear_canvas(self):
         self.canvas.delete('all')
         self.points = []
+        self.weights = []
         self.curves = []
+        self.curve_items = []
+        self.point_index.clear()
+        self.intersections = {}
         self.current_curve = None
         self.selected_point = None
         self.tangent_mode = False
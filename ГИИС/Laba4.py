@@ -1,7 +1,861 @@
+import io
+import os
+import re
+import struct
+import sys
+import tempfile
+import time
+import zipfile
+import zlib
+import argparse
 import tkinter as tk
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from tkinter import ttk, filedialog
 import numpy as np
-from math import cos, sin, radians
+from math import cos, sin, tan, radians
+
+FRAME_WIDTH = 600
+FRAME_HEIGHT = 600
+DISPLAY_SCALE = 50  # Фиксированный коэффициент визуализации
+SCREEN_CENTER = np.array([300.0, 300.0])
+CAMERA_DISTANCE = 5  # Камера стоит в точке (0, 0, -CAMERA_DISTANCE) и смотрит вдоль +z
+CAMERA_FOV = 90  # Горизонтальный угол обзора, градусы
+CAMERA_NEAR = 0.1
+CAMERA_FAR = 100.0
+DEPTH_EPSILON = 1e-9
+
+BACKGROUND_COLOR = (255, 255, 255)
+EDGE_COLOR = (0, 0, 0)
+VERTEX_COLOR = (255, 0, 0)
+VERTEX_RADIUS = 2
+RASTER_CHUNK = 1 << 20  # Максимум пикселей, растеризуемых за один проход
+MESH_CACHE_SUFFIX = '.cache.npz'
+FRAME_INTERVAL = 16  # Минимальный интервал между кадрами, мс (~60 кадров/с)
+LOD_EDGE_BUDGET = 50000  # Ребер в упрощенной модели, отображаемой во время перетаскивания
+LOD_MAX_RESOLUTION = 256  # Наибольшее число ячеек кластеризации по оси
+LOD_MIN_RESOLUTION = 4
+LOD_IDLE_DELAY = 250  # Через сколько мс без ввода возвращается полная детализация
+FIT_RADIUS = 2.5  # Радиус, к которому приводится модель при пакетной отрисовке с --fit
+PICK_RADIUS = 6  # Радиус выбора вершины щелчком, пикселей
+PICK_CELL = 16  # Размер ячейки экранной сетки для выбора вершин, пикселей
+PICK_COLOR = (0, 160, 0)
+BVH_LEAF_SIZE = 32
+
+
+def split_lines(data):
+    # starts - начало содержимого строки после отступа (пробелы и табуляции пропускаются)
+    chars = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(chars == ord('\n'))
+    if len(chars) and chars[-1] != ord('\n'):
+        ends = np.append(ends, len(chars))
+    starts = np.concatenate(([0], ends[:-1] + 1))[:len(ends)]
+
+    content = np.flatnonzero((chars != ord(' ')) & (chars != ord('\t')))
+    first = np.searchsorted(content, starts)
+    starts = np.minimum(np.append(content, len(chars))[first], ends)
+    return chars, starts, ends
+
+
+def extract_records(chars, starts, ends, tag):
+    """Номера строк "<tag> ..." и их содержимое без тега одним блоком байтов"""
+    # Строки вырезаются из буфера булевой маской, без цикла по строкам (vn/vt не попадают)
+    selected = ends - starts > len(tag)
+    last = len(chars) - 1
+    for i, code in enumerate(tag + b' '):
+        column = chars[np.minimum(starts + i, last)]
+        selected &= (column == code) | ((column == ord('\t')) if code == ord(' ') else False)
+    lines = np.flatnonzero(selected)
+
+    delta = np.zeros(len(chars) + 1, dtype=np.int8)
+    delta[starts[lines] + len(tag)] = 1
+    delta[np.minimum(ends[lines] + 1, len(chars))] = -1
+    block = chars[np.cumsum(delta[:-1], dtype=np.int8).astype(bool)].tobytes()
+
+    block = block.replace(b'\r', b'')
+    if b'#' in block:
+        block = re.sub(rb'#[^\n]*', b'', block)  # Комментарии в конце строки
+    return lines, block
+
+
+def parse_table(block, columns, dtype):
+    if not block.strip():
+        return np.empty((0, len(columns)), dtype=dtype)
+    return np.loadtxt(io.BytesIO(block), dtype=dtype, usecols=columns, ndmin=2)
+
+
+def parse_faces(block, face_lines, vertex_lines, vertex_count):
+    """Грани OBJ: треугольники (веерная триангуляция) и ребра многоугольников"""
+    if len(face_lines) == 0:
+        return np.empty((0, 3), dtype=np.int64), np.empty((0, 2), dtype=np.int64)
+
+    # Оставляем только индексы вершин (v/vt/vn -> v)
+    block = re.sub(rb'/[^\s]*', b'', block)
+    indices = np.array(block.split()).astype(np.int64)
+
+    # Номер грани для каждого индекса: считаем переводы строк перед началом каждого числа
+    chars = np.frombuffer(block, dtype=np.uint8)
+    newline = chars == ord('\n')
+    separator = newline | (chars == ord(' ')) | (chars == ord('\t'))
+    starts = ~separator & np.concatenate(([True], separator[:-1]))
+    face_of_index = np.cumsum(newline)[starts]
+    counts = np.bincount(face_of_index, minlength=len(face_lines))
+    offsets = np.cumsum(counts) - counts
+
+    # Индексы OBJ начинаются с 1; отрицательные отсчитываются от последней объявленной вершины
+    if (indices < 0).any():
+        declared = np.searchsorted(vertex_lines, face_lines)
+        indices = np.where(indices < 0, indices + declared[face_of_index], indices - 1)
+    else:
+        indices -= 1
+
+    # Ребра многоугольников: каждая вершина соединяется со следующей, последняя - с первой
+    following = np.arange(len(indices)) + 1
+    nonempty = counts > 0
+    following[(offsets + counts - 1)[nonempty]] = offsets[nonempty]
+    edges = np.column_stack([indices, indices[following]])
+
+    # Веерная триангуляция: (v0, vi, vi+1)
+    triangle_counts = np.maximum(counts - 2, 0)
+    face = np.repeat(np.arange(len(counts)), triangle_counts)
+    corner = np.arange(len(face)) - np.repeat(np.cumsum(triangle_counts) - triangle_counts, triangle_counts) + 1
+    base = offsets[face]
+    triangles = np.column_stack([indices[base], indices[base + corner], indices[base + corner + 1]])
+
+    valid = ((triangles >= 0) & (triangles < vertex_count)).all(axis=1)
+    return triangles[valid], edges
+
+
+def unique_edges(edges, vertex_count):
+    edges = edges[((edges >= 0) & (edges < vertex_count)).all(axis=1)]
+    first, second = np.minimum(edges[:, 0], edges[:, 1]), np.maximum(edges[:, 0], edges[:, 1])
+
+    # Ребро кодируется одним числом; дубликаты убираем сортировкой
+    keys = (first * vertex_count + second)[first != second]
+    if len(keys) == 0:
+        return np.empty((0, 2), dtype=np.int64)
+    keys.sort()
+    keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+    return np.column_stack([keys // vertex_count, keys % vertex_count])
+
+
+def cluster_mesh(vertices, edges, faces, resolution):
+    """Упрощение сетки кластеризацией вершин: вершины одной ячейки сетки resolution^3 сливаются в среднюю"""
+    points = vertices[:, :3]
+    lower = points.min(axis=0)
+    extent = max(np.ptp(points, axis=0).max(), DEPTH_EPSILON)
+    cells = np.minimum(((points - lower) * (resolution / extent)).astype(np.int64), resolution - 1)
+    keys = (cells[:, 0] * resolution + cells[:, 1]) * resolution + cells[:, 2]
+    keys, cluster = np.unique(keys, return_inverse=True)
+
+    counts = np.bincount(cluster)
+    merged = np.ones((len(keys), 4))
+    for axis in range(3):
+        merged[:, axis] = np.bincount(cluster, weights=points[:, axis]) / counts
+
+    # Ребра и грани, стянувшиеся в точку или отрезок, пропадают
+    edges = unique_edges(cluster[edges], len(keys))
+    faces = cluster[faces]
+    faces = faces[(faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 2] != faces[:, 0])]
+    return merged, edges, faces
+
+
+def build_lods(vertices, edges, faces, budget=LOD_EDGE_BUDGET):
+    """Уровни детализации от исходной сетки до первой, укладывающейся в бюджет ребер"""
+    levels = [(vertices, edges, faces)]
+    resolution = LOD_MAX_RESOLUTION
+    while len(levels[-1][1]) > budget and resolution >= LOD_MIN_RESOLUTION and len(vertices):
+        level = cluster_mesh(vertices, edges, faces, resolution)
+        if len(level[1]) < len(levels[-1][1]):
+            levels.append(level)
+        resolution //= 2
+    return levels
+
+
+def parse_mesh(data):
+    # Формат лабораторной: "v x y z", "e i j" (индексы с 0); из OBJ дополнительно "f" (индексы с 1)
+    chars, starts, ends = split_lines(data)
+    vertex_lines, vertex_block = extract_records(chars, starts, ends, b'v')
+    coords = parse_table(vertex_block, (0, 1, 2), float)
+    vertices = np.column_stack([coords, np.ones(len(coords))])
+
+    face_lines, face_block = extract_records(chars, starts, ends, b'f')
+    faces, face_edges = parse_faces(face_block, face_lines, vertex_lines, len(vertices))
+
+    _, edge_block = extract_records(chars, starts, ends, b'e')
+    edges = np.concatenate([parse_table(edge_block, (0, 1), np.int64), face_edges])
+    return vertices, unique_edges(edges, len(vertices)), faces
+
+
+def read_cache(cache_path, source):
+    # Сетка из кеша или None, если кеш устарел; поврежденный кеш дает исключение
+    with np.load(cache_path) as cache:
+        if not np.array_equal(cache['source'], source):
+            return None
+        vertices, edges, faces = cache['vertices'], cache['edges'], cache['faces']
+    if vertices.ndim != 2 or vertices.shape[1] != 4 or edges.ndim != 2 or edges.shape[1] != 2 or \
+            faces.ndim != 2 or faces.shape[1] != 3:
+        raise ValueError(f"Неверный формат кеша {cache_path}")
+    return vertices, edges, faces
+
+
+def write_cache(cache_path, **arrays):
+    # Запись во временный файл того же каталога и атомарная замена: читатель видит старый или полный кеш
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(cache_path) + '.', suffix='.tmp',
+                                     dir=os.path.dirname(cache_path) or '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(temp_path, cache_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def load_mesh(path, use_cache=True):
+    """Загрузка модели с бинарным кешем .npz рядом с исходным файлом"""
+    cache_path = path + MESH_CACHE_SUFFIX
+    stat = os.stat(path)
+    source = np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+    if use_cache and os.path.exists(cache_path):
+        try:
+            mesh = read_cache(cache_path, source)
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            mesh = None  # Поврежденный кеш перезаписывается после разбора исходного файла
+        if mesh is not None:
+            return mesh
+
+    with open(path, 'rb') as f:
+        vertices, edges, faces = parse_mesh(f.read())
+
+    if use_cache:
+        try:
+            write_cache(cache_path, vertices=vertices, edges=edges, faces=faces, source=source)
+        except OSError:
+            pass  # Каталог только для чтения - работаем без кеша
+    return vertices, edges, faces
+
+
+def clip_segments(segments, width, height):
+    """Отсечение отрезков (N, 4) границами кадра по Лянгу - Барски, векторно
+
+    Дополнительные столбцы (например, глубины концов z1, z2) интерполируются вместе с концами.
+    """
+    segments = segments[np.isfinite(segments).all(axis=1)]
+    x1, y1, x2, y2 = segments[:, :4].T
+    dx, dy = x2 - x1, y2 - y1
+
+    p = np.stack([-dx, dx, -dy, dy])
+    q = np.stack([x1, width - 1 - x1, y1, height - 1 - y1])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = q / p
+
+    keep = ~((p == 0) & (q < 0)).any(axis=0)
+    t0 = np.where(p < 0, r, 0.0).max(axis=0)
+    t1 = np.where(p > 0, r, 1.0).min(axis=0)
+    keep &= t0 <= t1
+
+    t0, t1 = t0[keep], t1[keep]
+    x1, y1, dx, dy = x1[keep], y1[keep], dx[keep], dy[keep]
+    extra = segments[keep, 4:]
+    if extra.shape[1] == 0:
+        return np.column_stack([x1 + t0 * dx, y1 + t0 * dy, x1 + t1 * dx, y1 + t1 * dy])
+
+    first, last = extra[:, 0::2], extra[:, 1::2]
+    step = last - first
+    extra = np.empty_like(extra)
+    extra[:, 0::2] = first + t0[:, None] * step
+    extra[:, 1::2] = first + t1[:, None] * step
+    return np.column_stack([x1 + t0 * dx, y1 + t0 * dy, x1 + t1 * dx, y1 + t1 * dy, extra])
+
+
+def rasterize_lines(framebuffer, segments, color, zbuffer=None, bias=0.0):
+    """Векторная растеризация отрезков (ЦДА сразу для всех ребер)
+
+    С z-буфером отрезки задаются как (N, 6) с глубинами концов, и рисуются только
+    пиксели, не закрытые гранями.
+    """
+    if len(segments) == 0:
+        return
+
+    steps = np.ceil(np.abs(segments[:, 2:4] - segments[:, :2]).max(axis=1)).astype(np.int64) + 1
+    ends = np.cumsum(steps)
+
+    # Ребра обрабатываются порциями, чтобы ограничить объем временных массивов
+    start = 0
+    while start < len(segments):
+        stop = int(np.searchsorted(ends, ends[start] - steps[start] + RASTER_CHUNK, side='right'))
+        stop = max(stop, start + 1)
+        chunk, chunk_steps = segments[start:stop], steps[start:stop]
+
+        edge = np.repeat(np.arange(len(chunk)), chunk_steps)
+        offset = np.arange(len(edge)) - np.repeat(np.cumsum(chunk_steps) - chunk_steps, chunk_steps)
+        t = offset / np.maximum(chunk_steps - 1, 1)[edge]
+
+        x1, y1, x2, y2 = chunk[edge, :4].T
+        xs = np.rint(x1 + t * (x2 - x1)).astype(np.int64)
+        ys = np.rint(y1 + t * (y2 - y1)).astype(np.int64)
+        if zbuffer is not None:
+            z1, z2 = chunk[edge, 4], chunk[edge, 5]
+            visible = z1 + t * (z2 - z1) <= zbuffer[ys, xs] + bias
+            xs, ys = xs[visible], ys[visible]
+        framebuffer[ys, xs] = color
+        start = stop
+
+
+def rasterize_depth(zbuffer, triangles, depths):
+    """Заполнение z-буфера треугольниками (F, 3, 2) с глубинами вершин (F, 3)
+
+    Глубина должна быть линейной в экранных координатах, тогда ее можно
+    интерполировать барицентрическими координатами пикселя.
+    """
+    height, width = zbuffer.shape
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    area = (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0])
+
+    lower = np.ceil(triangles.min(axis=1))
+    upper = np.floor(triangles.max(axis=1))
+    keep = (area != 0) & np.isfinite(area) & np.isfinite(depths).all(axis=1)
+    keep &= (upper[:, 0] >= 0) & (upper[:, 1] >= 0) & (lower[:, 0] < width) & (lower[:, 1] < height)
+    if not keep.any():
+        return
+
+    triangles, depths, area = triangles[keep], depths[keep], area[keep]
+    lower = np.maximum(lower[keep], 0).astype(np.int64)
+    upper = np.minimum(upper[keep], [width - 1, height - 1]).astype(np.int64)
+    box = upper - lower + 1
+    counts = np.maximum(box[:, 0], 0) * np.maximum(box[:, 1], 0)
+    ends = np.cumsum(counts)
+    flat = zbuffer.reshape(-1)
+
+    # Пиксели ограничивающих прямоугольников перебираются порциями, как и в rasterize_lines
+    start = 0
+    while start < len(triangles):
+        stop = int(np.searchsorted(ends, ends[start] - counts[start] + RASTER_CHUNK, side='right'))
+        stop = max(stop, start + 1)
+        chunk_counts = counts[start:stop]
+
+        tri = np.repeat(np.arange(start, stop), chunk_counts)
+        offset = np.arange(len(tri)) - np.repeat(np.cumsum(chunk_counts) - chunk_counts, chunk_counts)
+        xs = lower[tri, 0] + offset % box[tri, 0]
+        ys = lower[tri, 1] + offset // box[tri, 0]
+
+        a, b, c = triangles[tri, 0], triangles[tri, 1], triangles[tri, 2]
+        w0 = ((b[:, 0] - xs) * (c[:, 1] - ys) - (b[:, 1] - ys) * (c[:, 0] - xs)) / area[tri]
+        w1 = ((c[:, 0] - xs) * (a[:, 1] - ys) - (c[:, 1] - ys) * (a[:, 0] - xs)) / area[tri]
+        w2 = 1 - w0 - w1
+        inside = (w0 >= 0) & (w1 >= 0) & (w2 >= 0)
+
+        z = w0 * depths[tri, 0] + w1 * depths[tri, 1] + w2 * depths[tri, 2]
+        np.minimum.at(flat, ys[inside] * width + xs[inside], z[inside])
+        start = stop
+
+
+class Camera:
+    """Перспективная камера с углом обзора и ближней/дальней плоскостями отсечения"""
+
+    def __init__(self, fov=CAMERA_FOV, near=CAMERA_NEAR, far=CAMERA_FAR, distance=CAMERA_DISTANCE):
+        self.fov = fov
+        self.near = near
+        self.far = far
+        self.distance = distance
+
+    @property
+    def focal(self):
+        """Фокусное расстояние в пикселях"""
+        return FRAME_WIDTH / 2 / tan(radians(self.fov) / 2)
+
+    def depth(self, view, out=None):
+        """Расстояние от камеры вдоль оси взгляда"""
+        return np.add(view[..., 2], self.distance, out=out)
+
+    def project(self, points):
+        """Экранные координаты точек (..., 3), заданных как (x, y, глубина)"""
+        return points[..., :2] * (self.focal / points[..., 2:3]) + SCREEN_CENTER
+
+    def outcodes(self, view):
+        """Битовые коды положения вершин относительно шести плоскостей пирамиды видимости"""
+        depth = self.depth(view)
+        x, y = view[:, 0], view[:, 1]
+        half_width = depth * (FRAME_WIDTH / 2 / self.focal)
+        half_height = depth * (FRAME_HEIGHT / 2 / self.focal)
+        codes = (depth < self.near).astype(np.uint8)
+        codes |= (depth > self.far).astype(np.uint8) << 1
+        codes |= (x < -half_width).astype(np.uint8) << 2
+        codes |= (x > half_width).astype(np.uint8) << 3
+        codes |= (y < -half_height).astype(np.uint8) << 4
+        codes |= (y > half_height).astype(np.uint8) << 5
+        return codes
+
+    def clip_edges(self, view, edges):
+        """Отсечение ребер пирамидой видимости, возвращает экранные отрезки (N, 6) с глубинами концов
+
+        Ребра, целиком лежащие вне одной из плоскостей, отбрасываются по кодам вершин;
+        остальные обрезаются ближней и дальней плоскостями. Боковые плоскости
+        дорезает clip_segments уже в экранных координатах.
+        """
+        codes = self.outcodes(view)
+        edges = edges[(codes[edges[:, 0]] & codes[edges[:, 1]]) == 0]
+
+        points = view[edges, :3]
+        points[..., 2] += self.distance
+        for plane, sign in ((self.near, 1), (self.far, -1)):
+            start, end = points[:, 0], points[:, 1]
+            outside = sign * (points[..., 2] - plane) < 0
+            with np.errstate(divide='ignore', invalid='ignore'):
+                t = ((plane - start[:, 2]) / (end[:, 2] - start[:, 2]))[:, None]
+                hit = start + t * (end - start)
+            points[:, 0] = np.where(outside[:, 0, None], hit, start)
+            points[:, 1] = np.where(outside[:, 1, None], hit, end)
+
+        segments = np.empty((len(points), 6))
+        segments[:, :4] = self.project(points).reshape(-1, 4)
+        segments[:, 4:] = points[..., 2]
+        return segments
+
+
+def rasterize_points(framebuffer, points, color, radius=VERTEX_RADIUS):
+    height, width = framebuffer.shape[:2]
+    points = points[np.isfinite(points).all(axis=1)]
+    centers = np.rint(points).astype(np.int64)
+    for dy in range(-radius, radius + 1):
+        for dx in range(-radius, radius + 1):
+            xs, ys = centers[:, 0] + dx, centers[:, 1] + dy
+            inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+            framebuffer[ys[inside], xs[inside]] = color
+
+
+def draw_wireframe(framebuffer, screen, edges, segments=None):
+    """Каркас модели; готовые отрезки (например, после отсечения камерой) можно передать явно"""
+    height, width = framebuffer.shape[:2]
+    if segments is None:
+        segments = screen[edges].reshape(-1, 4)
+    rasterize_lines(framebuffer, clip_segments(segments[:, :4], width, height), EDGE_COLOR)
+    rasterize_points(framebuffer, screen, VERTEX_COLOR)
+
+
+def front_faces(view, faces, camera=None):
+    """Маска лицевых граней (нормаль по обходу против часовой стрелки смотрит на камеру)"""
+    a, b, c = view[faces[:, 0], :3], view[faces[:, 1], :3], view[faces[:, 2], :3]
+    normals = np.cross(b - a, c - a)
+    if camera is not None:
+        # Грани, выходящие за ближнюю или дальнюю плоскость, отбрасываются целиком
+        sight = a + [0.0, 0.0, camera.distance]
+        front = np.einsum('ij,ij->i', normals, sight) < 0
+        codes = camera.outcodes(view)[faces]
+        front &= ((codes & 3) == 0).all(axis=1)
+        front &= np.bitwise_and.reduce(codes, axis=1) == 0
+        return front
+    return normals[:, 2] < 0
+
+
+def draw_hidden_lines(framebuffer, zbuffer, screen, view, edges, faces, camera=None):
+    """Каркас с отсечением нелицевых граней и удалением невидимых линий по z-буферу"""
+    height, width = framebuffer.shape[:2]
+    n = len(screen)
+    visible_faces = faces[front_faces(view, faces, camera)]
+    if len(visible_faces) == 0:
+        return  # Все грани отвернуты от камеры - видимых линий нет
+
+    # Глубина, линейная в экранных координатах: z для ортографической проекции, -1/z - для перспективы
+    if camera is not None:
+        with np.errstate(divide='ignore'):
+            depth = -1.0 / camera.depth(view)
+    else:
+        depth = view[:, 2]
+
+    zbuffer.fill(np.inf)
+    rasterize_depth(zbuffer, screen[visible_faces], depth[visible_faces])
+    used = np.unique(visible_faces)
+    span = np.ptp(depth[used]) if len(used) else 0.0
+    bias = 1e-3 * span + DEPTH_EPSILON
+
+    # Рисуются только ребра, принадлежащие хотя бы одной лицевой грани
+    sides = unique_edges(visible_faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), n)
+    edges = edges[np.isin(edges[:, 0] * n + edges[:, 1], sides[:, 0] * n + sides[:, 1])]
+    segments = np.column_stack([screen[edges].reshape(-1, 4), depth[edges]])
+    rasterize_lines(framebuffer, clip_segments(segments, width, height), EDGE_COLOR, zbuffer, bias)
+
+    points = np.unique(edges)
+    xs, ys = np.rint(screen[points]).astype(np.int64).T
+    inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+    points, xs, ys = points[inside], xs[inside], ys[inside]
+    points = points[depth[points] <= zbuffer[ys, xs] + bias]
+    rasterize_points(framebuffer, screen[points], VERTEX_COLOR)
+
+
+def transformation_matrix(translation, rotation, scale):
+    """Собираем итоговую матрицу трансформации (углы в градусах)"""
+    # Матрица перемещения
+    translate_mat = np.array([
+        [1, 0, 0, translation[0]],
+        [0, 1, 0, translation[1]],
+        [0, 0, 1, translation[2]],
+        [0, 0, 0, 1]
+    ])
+
+    # Матрицы вращения
+    rx = radians(rotation[0])
+    ry = radians(rotation[1])
+    rz = radians(rotation[2])
+
+    rot_x = np.array([
+        [1, 0, 0, 0],
+        [0, cos(rx), -sin(rx), 0],
+        [0, sin(rx), cos(rx), 0],
+        [0, 0, 0, 1]
+    ])
+
+    rot_y = np.array([
+        [cos(ry), 0, sin(ry), 0],
+        [0, 1, 0, 0],
+        [-sin(ry), 0, cos(ry), 0],
+        [0, 0, 0, 1]
+    ])
+
+    rot_z = np.array([
+        [cos(rz), -sin(rz), 0, 0],
+        [sin(rz), cos(rz), 0, 0],
+        [0, 0, 1, 0],
+        [0, 0, 0, 1]
+    ])
+
+    # Матрица масштабирования
+    scale_mat = np.array([
+        [scale, 0, 0, 0],
+        [0, scale, 0, 0],
+        [0, 0, scale, 0],
+        [0, 0, 0, 1]
+    ])
+
+    # Порядок преобразований: масштаб -> вращение -> перемещение
+    return translate_mat @ rot_z @ rot_y @ rot_x @ scale_mat
+
+
+def draw_mesh(framebuffer, zbuffer, screen, view, edges, faces, camera=None, hidden_lines=False):
+    """Отрисовка модели в выбранном режиме (camera=None - ортографическая проекция)"""
+    if hidden_lines and len(faces):
+        draw_hidden_lines(framebuffer, zbuffer, screen, view, edges, faces, camera)
+    elif camera is not None:
+        draw_wireframe(framebuffer, screen, edges, camera.clip_edges(view, edges))
+    else:
+        draw_wireframe(framebuffer, screen, edges)
+
+
+def project_points(view, camera=None):
+    """Экранные координаты вершин в пространстве камеры (вне ближней/дальней плоскостей - NaN)"""
+    if camera is None:
+        return view[:, :2] * DISPLAY_SCALE + SCREEN_CENTER
+    depth = camera.depth(view)
+    points = np.column_stack([view[:, :2], depth])
+    points[(depth < camera.near) | (depth > camera.far)] = np.nan
+    return camera.project(points)
+
+
+def render_mesh(vertices, edges, faces, matrix, camera=None, hidden_lines=False):
+    """Кадр модели без окна: NumPy-буфер (FRAME_HEIGHT, FRAME_WIDTH, 3)"""
+    framebuffer = np.empty((FRAME_HEIGHT, FRAME_WIDTH, 3), dtype=np.uint8)
+    framebuffer[:] = BACKGROUND_COLOR
+    if len(vertices):
+        view = vertices @ matrix.T
+        zbuffer = np.empty((FRAME_HEIGHT, FRAME_WIDTH)) if hidden_lines else None
+        draw_mesh(framebuffer, zbuffer, project_points(view, camera), view, edges, faces, camera, hidden_lines)
+    return framebuffer
+
+
+def framebuffer_to_ppm(framebuffer):
+    height, width = framebuffer.shape[:2]
+    return f'P6 {width} {height} 255 '.encode() + framebuffer.tobytes()
+
+
+def framebuffer_to_png(framebuffer):
+    """PNG (RGB, 8 бит) средствами zlib, без сторонних библиотек"""
+    height, width = framebuffer.shape[:2]
+    rows = np.zeros((height, width * 3 + 1), dtype=np.uint8)  # Байт фильтра 0 в начале каждой строки
+    rows[:, 1:] = framebuffer.reshape(height, -1)
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) +
+            chunk(b'IDAT', zlib.compress(rows.tobytes(), 6)) + chunk(b'IEND', b''))
+
+
+@lru_cache(maxsize=4)
+def cached_mesh(path, fit=False):
+    """Модель для пакетной отрисовки; в каждом процессе пула загружается один раз"""
+    vertices, edges, faces = load_mesh(path)
+    if fit and len(vertices):
+        points = vertices[:, :3]
+        center = (points.min(axis=0) + points.max(axis=0)) / 2
+        radius = max(np.linalg.norm(points - center, axis=1).max(), DEPTH_EPSILON)
+        vertices = vertices.copy()
+        vertices[:, :3] = (points - center) * (FIT_RADIUS / radius)
+    return vertices, edges, faces
+
+
+def render_task(task):
+    """Один кадр пакетной отрисовки (функция модуля, чтобы передаваться в пул процессов)"""
+    path, output, matrix, camera, hidden_lines, fit = task
+    try:
+        vertices, edges, faces = cached_mesh(path, fit)
+        framebuffer = render_mesh(vertices, edges, faces, matrix, camera, hidden_lines)
+        with open(output, 'wb') as f:
+            f.write(framebuffer_to_png(framebuffer))
+    except Exception as error:
+        # Одна испорченная модель не должна останавливать всю пачку
+        print(f"{path}: {type(error).__name__}: {error}", file=sys.stderr)
+        return None
+    return output
+
+
+def parse_transform(text):
+    """'tx,ty,tz,rx,ry,rz[,s]' -> (перемещение, углы, масштаб)"""
+    values = [float(v) for v in text.split(',')]
+    if len(values) not in (6, 7):
+        raise argparse.ArgumentTypeError(f"ожидалось 6 или 7 чисел через запятую: {text!r}")
+    scale = values[6] if len(values) == 7 else 1.0
+    return values[:3], values[3:6], scale
+
+
+def frame_transforms(args):
+    """Список (перемещение, углы, масштаб) всех кадров по аргументам командной строки"""
+    if args.transform:
+        return args.transform
+    translation, rotation = list(args.translate), list(args.rotate)
+    if args.turntable is None:
+        return [(translation, rotation, args.scale)]
+
+    axis = 'xyz'.index(args.turntable)
+    frames = []
+    for i in range(args.frames):
+        angles = rotation.copy()
+        angles[axis] += 360.0 * i / args.frames
+        frames.append((translation, angles, args.scale))
+    return frames
+
+
+class ScreenGrid:
+    """Индекс вершин кадра по ячейкам экрана, строится из экранных координат после проекции"""
+
+    def __init__(self, screen, cell=PICK_CELL):
+        self.cell = cell
+        self.columns = -(-FRAME_WIDTH // cell)
+        self.rows = -(-FRAME_HEIGHT // cell)
+        x, y = screen[:, 0], screen[:, 1]
+        visible = np.flatnonzero((x >= 0) & (x < FRAME_WIDTH) & (y >= 0) & (y < FRAME_HEIGHT))
+
+        # Номера ячеек помещаются в int16, поэтому устойчивая сортировка идет поразрядно, за O(N)
+        cells = (y[visible] * (1 / cell)).astype(np.int16) * self.columns
+        cells += (x[visible] * (1 / cell)).astype(np.int16)
+        order = np.argsort(cells, kind='stable')
+        self.vertices = visible[order]
+        self.points = screen[self.vertices]
+        self.starts = np.concatenate(([0], np.cumsum(np.bincount(cells, minlength=self.columns * self.rows))))
+
+    def nearest(self, x, y, radius=PICK_RADIUS):
+        """Индекс ближайшей к точке экрана вершины не дальше radius или None"""
+        first = max(int((x - radius) // self.cell), 0)
+        last = min(int((x + radius) // self.cell), self.columns - 1)
+        rows = range(max(int((y - radius) // self.cell), 0), min(int((y + radius) // self.cell), self.rows - 1) + 1)
+        if first > last or not rows:
+            return None
+
+        # Ячейки одной строки сетки лежат в self.vertices подряд
+        candidates = np.concatenate([np.arange(self.starts[row * self.columns + first],
+                                               self.starts[row * self.columns + last + 1]) for row in rows])
+        if len(candidates) == 0:
+            return None
+
+        distances = ((self.points[candidates] - [x, y]) ** 2).sum(axis=1)
+        best = np.argmin(distances)
+        if distances[best] > radius * radius:
+            return None
+        return int(self.vertices[candidates[best]])
+
+
+def spread_bits(values):
+    """Раздвигает 10 младших битов через два (для кода Мортона)"""
+    values = values & 0x3FF
+    values = (values | (values << 16)) & 0x030000FF
+    values = (values | (values << 8)) & 0x0300F00F
+    values = (values | (values << 4)) & 0x030C30C3
+    values = (values | (values << 2)) & 0x09249249
+    return values
+
+
+class VertexBVH:
+    """Иерархия ограничивающих объемов над вершинами (N, 3)
+
+    Вершины упорядочиваются по коду Мортона, листья - подряд идущие BVH_LEAF_SIZE вершин,
+    над ними полное двоичное дерево в массиве (потомки узла i - 2i + 1 и 2i + 2).
+    """
+
+    def __init__(self, points, leaf_size=BVH_LEAF_SIZE):
+        lower = points.min(axis=0)
+        extent = np.maximum(np.ptp(points, axis=0), DEPTH_EPSILON)
+        grid = ((points - lower) * (1023 / extent)).astype(np.int64)
+        codes = spread_bits(grid[:, 0]) | (spread_bits(grid[:, 1]) << 1) | (spread_bits(grid[:, 2]) << 2)
+        self.order = np.argsort(codes, kind='stable')
+        self.points = points[self.order]
+        self.leaf_size = leaf_size
+
+        leaves = -(-len(points) // leaf_size)
+        self.size = 1 << max(leaves - 1, 0).bit_length()
+        starts = np.arange(leaves) * leaf_size
+        self.lower = np.full((2 * self.size - 1, 3), np.inf)
+        self.upper = np.full((2 * self.size - 1, 3), -np.inf)
+        self.lower[self.size - 1:self.size - 1 + leaves] = np.minimum.reduceat(self.points, starts)
+        self.upper[self.size - 1:self.size - 1 + leaves] = np.maximum.reduceat(self.points, starts)
+
+        # Внутренние узлы заполняются снизу вверх, по уровню за раз
+        level = self.size - 1
+        while level > 0:
+            parents = np.arange((level - 1) // 2, level)
+            self.lower[parents] = np.minimum(self.lower[2 * parents + 1], self.lower[2 * parents + 2])
+            self.upper[parents] = np.maximum(self.upper[2 * parents + 1], self.upper[2 * parents + 2])
+            level = (level - 1) // 2
+
+    def query(self, origin, direction, spread=0.0, offset=0.0):
+        """Вершины, которые могут лежать в конусе вокруг луча origin + t * direction (direction[2] = 1)
+
+        Допуск по x, y на высоте z равен spread * t + offset; проверка по узлам консервативна,
+        окончательный отбор - у вызывающего. Узлы дерева обходятся по уровням, векторно.
+        """
+        nodes = np.zeros(1, dtype=np.int64)
+        leaves = []
+        while len(nodes):
+            lower, upper = self.lower[nodes], self.upper[nodes]
+            tolerance = spread * np.maximum(upper[:, 2] - origin[2], 0) + offset
+            lower = lower - np.column_stack([tolerance, tolerance, np.zeros(len(nodes))])
+            upper = upper + np.column_stack([tolerance, tolerance, np.zeros(len(nodes))])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                near = (lower - origin) / direction
+                far = (upper - origin) / direction
+            # Для осей, параллельных лучу, пересечение определяется положением начала луча
+            parallel = direction == 0
+            inside = (origin >= lower) & (origin <= upper)
+            entry = np.where(parallel, np.where(inside, -np.inf, np.inf), np.minimum(near, far)).max(axis=1)
+            leave = np.where(parallel, np.where(inside, np.inf, -np.inf), np.maximum(near, far)).min(axis=1)
+            nodes = nodes[(entry <= leave) & (leave >= 0)]
+
+            is_leaf = nodes >= self.size - 1
+            leaves.append(nodes[is_leaf] - (self.size - 1))
+            nodes = nodes[~is_leaf]
+            nodes = np.concatenate([2 * nodes + 1, 2 * nodes + 2])
+
+        leaves = np.concatenate(leaves)
+        if len(leaves) == 0:
+            return np.empty(0, dtype=np.int64)
+        indices = (leaves[:, None] * self.leaf_size + np.arange(self.leaf_size)).ravel()
+        return self.order[indices[indices < len(self.order)]]
+
+
+class SceneNode:
+    """Узел графа сцены: сетка (у группы может отсутствовать) и преобразование относительно родителя"""
+
+    def __init__(self, name, mesh=None, parent=None):
+        self.name = name
+        self.parent = parent
+        self.children = []
+        self.lods = build_lods(*mesh) if mesh is not None else None
+        self.translation = np.zeros(3)
+        self.rotation = np.zeros(3)  # Углы в градусах
+        self.scale = 1.0
+        self.world = None  # Кеш мировой матрицы, None - требует пересчета
+        if parent is not None:
+            parent.children.append(self)
+
+    def set_transform(self, translation=None, rotation=None, scale=None):
+        if translation is not None:
+            self.translation = np.array(translation, dtype=float)
+        if rotation is not None:
+            self.rotation = np.array(rotation, dtype=float)
+        if scale is not None:
+            self.scale = scale
+        self.invalidate()
+
+    def invalidate(self):
+        """Сброс мировой матрицы узла и всех потомков"""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            # Потомки узла без кеша тоже без кеша: матрица потомка считается через матрицу предка
+            if node.world is not None:
+                node.world = None
+                stack.extend(node.children)
+
+    def world_matrix(self):
+        if self.world is None:
+            local = transformation_matrix(self.translation, self.rotation, self.scale)
+            self.world = local if self.parent is None else self.parent.world_matrix() @ local
+        return self.world
+
+    def walk(self, depth=0):
+        """Обход поддерева в глубину: (узел, глубина)"""
+        yield self, depth
+        for child in self.children:
+            yield from child.walk(depth + 1)
+
+
+class Scene:
+    """Граф сцены; вершины всех объектов собираются в один массив для проекции"""
+
+    def __init__(self):
+        self.root = SceneNode('Сцена')
+        self.batches = {}  # Уровень детализации -> (вершины, ребра, грани, участки объектов)
+        self.simplified = False  # Есть ли у какого-либо объекта упрощенные уровни
+        self.version = 0  # Растет при каждом изменении мировых координат вершин
+
+    def add(self, name, mesh, parent=None):
+        node = SceneNode(name, mesh, parent or self.root)
+        self.simplified |= len(node.lods) > 1
+        self.batches.clear()
+        return node
+
+    def nodes(self):
+        return [(node, depth) for node, depth in self.root.walk() if node is not self.root]
+
+    def build_batch(self, level):
+        spans, edges, faces = [], [np.empty((0, 2), dtype=np.int64)], [np.empty((0, 3), dtype=np.int64)]
+        offset = 0
+        for node, _ in self.root.walk():
+            if node.lods is None:
+                continue
+            local, node_edges, node_faces = node.lods[level]
+            spans.append([node, local, offset, None])
+            edges.append(node_edges + offset)
+            faces.append(node_faces + offset)
+            offset += len(local)
+        return np.empty((offset, 4)), np.concatenate(edges), np.concatenate(faces), spans
+
+    def batch(self, level=0):
+        """Мировые координаты вершин всех объектов (N, 4), ребра и грани в общей нумерации
+
+        Вершины объекта пересчитываются, только если его мировая матрица изменилась.
+        level - индекс уровня детализации каждого объекта (0 - полный, -1 - самый грубый).
+        """
+        if level not in self.batches:
+            self.batches[level] = self.build_batch(level)
+        vertices, edges, faces, spans = self.batches[level]
+        for span in spans:
+            node, local, start, applied = span
+            world = node.world_matrix()
+            if applied is not world:
+                np.matmul(local, world.T, out=vertices[start:start + len(local)])
+                span[3] = world
+                self.version += 1
+        return vertices, edges, faces
+
+    def locate(self, index, level=0):
+        """Объект и номер его вершины по номеру вершины в общем массиве"""
+        spans = self.batches[level][3]
+        starts = [start for _, _, start, _ in spans]
+        node, _, start, _ = spans[int(np.searchsorted(starts, index, side='right')) - 1]
+        return node, index - start
 
 
 class ThreeDEditor:
@@ -10,23 +864,44 @@ class ThreeDEditor:
         self.root.title("3D Geometry Editor")
         self.root.bind("<Key>", self.on_key_press)
 
-        # Инициализация параметров трансформации
-        self.translation = np.array([0.0, 0.0, 0.0])
-        self.rotation = np.array([0.0, 0.0, 0.0])  # Углы в градусах
-        self.scale = 1.0
-        self.zoom = 1.0
-
-        self.vertices = np.empty((0, 4))
-        self.original_vertices = self.vertices.copy()
-        self.edges = []
+        # Объекты и их преобразования хранятся в графе сцены; ползунки управляют выбранным объектом
+        self.scene = Scene()
+        self.selected = None
+        self.interacting = False  # Пока идет ввод, рисуется самый грубый уровень детализации
+        self.idle_pending = None
         self.projection = 'orthographic'
+        self.camera = Camera()
+        self.hidden_lines = False
+        self.allocate_buffers(0)
+
+        # Выбор вершин: экранная сетка обновляется с каждым кадром, BVH - при изменении сцены
+        self.pick_grid = None
+        self.pick_level = 0
+        self.picked = None  # (объект, номер вершины, уровень детализации)
+        self.bvh = None
+        self.bvh_version = -1
+
+        # Планировщик кадров: изменения лишь помечают вид устаревшим
+        self.render_pending = None
+        self.last_frame = 0.0
+        self.frame_time = 0.0
+        self.frame_stamps = deque()
 
         self.create_widgets()
-        self.update_3d_view()
+        self.request_render()
 
     def create_widgets(self):
-        self.canvas = tk.Canvas(self.root, width=600, height=600, bg='white')
+        self.canvas = tk.Canvas(self.root, width=FRAME_WIDTH, height=FRAME_HEIGHT, bg='white')
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.canvas.bind("<Button-1>", lambda e: self.pick_vertex(e.x, e.y))
+        self.canvas.bind("<Shift-Button-1>", lambda e: self.pick_ray(e.x, e.y))
+
+        # Весь кадр - одно изображение на холсте, независимо от размера модели
+        self.framebuffer = np.empty((FRAME_HEIGHT, FRAME_WIDTH, 3), dtype=np.uint8)
+        self.zbuffer = np.empty((FRAME_HEIGHT, FRAME_WIDTH))
+        self.photo = tk.PhotoImage(width=FRAME_WIDTH, height=FRAME_HEIGHT)
+        self.canvas.create_image(0, 0, image=self.photo, anchor='nw')
+        self.stats_item = self.canvas.create_text(5, 5, anchor='nw', fill='gray25', font=('Courier', 9))
 
         control_frame = ttk.Frame(self.root, padding=10)
         control_frame.pack(side=tk.RIGHT, fill=tk.Y)
@@ -34,6 +909,15 @@ class ThreeDEditor:
         # Панель загрузки
         ttk.Label(control_frame, text="Загрузка").pack(pady=(0, 5))
         ttk.Button(control_frame, text="Загрузить файл", command=self.load_from_file).pack(fill=tk.X)
+        self.attach_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(control_frame, text="Дочерний к выбранному", variable=self.attach_var).pack(fill=tk.X)
+
+        # Выбор объекта сцены
+        ttk.Label(control_frame, text="Объект").pack(pady=(10, 0))
+        self.node_list = []
+        self.node_box = ttk.Combobox(control_frame, state='readonly')
+        self.node_box.bind('<<ComboboxSelected>>', lambda e: self.select_node(self.node_list[self.node_box.current()]))
+        self.node_box.pack(fill=tk.X)
 
         # Панель проекции
         ttk.Label(control_frame, text="Проекция").pack(pady=(10, 0))
@@ -42,16 +926,38 @@ class ThreeDEditor:
         ttk.Button(control_frame, text="Ортографическая", command=lambda: self.set_projection('orthographic')).pack(
             fill=tk.X)
 
+        # Параметры камеры (для перспективной проекции)
+        ttk.Label(control_frame, text="Угол обзора").pack(pady=(10, 0))
+        self.fov_slider = ttk.Scale(control_frame, from_=20, to=150, orient=tk.HORIZONTAL,
+                                    command=lambda v: self.set_camera(fov=float(v)))
+        self.fov_slider.set(self.camera.fov)
+        self.fov_slider.pack(fill=tk.X)
+        planes_frame = ttk.Frame(control_frame)
+        planes_frame.pack(fill=tk.X)
+        self.near_var = tk.DoubleVar(value=self.camera.near)
+        self.far_var = tk.DoubleVar(value=self.camera.far)
+        ttk.Label(planes_frame, text="near").pack(side=tk.LEFT)
+        ttk.Spinbox(planes_frame, from_=0.01, to=50, increment=0.1, width=5, textvariable=self.near_var,
+                    command=lambda: self.set_camera(near=self.near_var.get())).pack(side=tk.LEFT)
+        ttk.Label(planes_frame, text="far").pack(side=tk.LEFT)
+        ttk.Spinbox(planes_frame, from_=1, to=1000, increment=1, width=5, textvariable=self.far_var,
+                    command=lambda: self.set_camera(far=self.far_var.get())).pack(side=tk.LEFT)
+
+        # Режим отображения
+        self.hidden_lines_var = tk.BooleanVar(value=self.hidden_lines)
+        ttk.Checkbutton(control_frame, text="Удаление невидимых линий", variable=self.hidden_lines_var,
+                        command=lambda: self.set_hidden_lines(self.hidden_lines_var.get())).pack(fill=tk.X)
+
         # Панель перемещения
         ttk.Label(control_frame, text="Перемещение").pack(pady=(10, 0))
         self.tx = ttk.Scale(control_frame, from_=-100, to=100, orient=tk.HORIZONTAL,
-                            command=lambda v: self.set_translation(float(v) / 50, 0, 0))
+                            command=lambda v: self.set_translation('x', float(v) / 50))
         self.tx.pack(fill=tk.X)
         self.ty = ttk.Scale(control_frame, from_=-100, to=100, orient=tk.HORIZONTAL,
-                            command=lambda v: self.set_translation(0, float(v) / 50, 0))
+                            command=lambda v: self.set_translation('y', float(v) / 50))
         self.ty.pack(fill=tk.X)
         self.tz = ttk.Scale(control_frame, from_=-100, to=100, orient=tk.HORIZONTAL,
-                            command=lambda v: self.set_translation(0, 0, float(v) / 50))
+                            command=lambda v: self.set_translation('z', float(v) / 50))
         self.tz.pack(fill=tk.X)
 
         # Панель вращения
@@ -81,142 +987,197 @@ class ThreeDEditor:
         if not file_path:
             return
 
-        with open(file_path, 'r') as f:
-            verts = []
-            edges = []
-            for line in f:
-                parts = line.strip().split()
-                if not parts:
-                    continue
-                if parts[0] == 'v' and len(parts) == 4:
-                    verts.append([float(parts[1]), float(parts[2]), float(parts[3]), 1])
-                elif parts[0] == 'e' and len(parts) == 3:
-                    edges.append((int(parts[1]), int(parts[2])))
-
-            self.vertices = np.array(verts)
-            self.original_vertices = self.vertices.copy()
-            self.edges = edges
-            self.reset_transforms()
-            self.update_3d_view()
-
-    def get_transformation_matrix(self):
-        """Собираем итоговую матрицу трансформации"""
-        # Матрица перемещения
-        translate_mat = np.array([
-            [1, 0, 0, self.translation[0]],
-            [0, 1, 0, self.translation[1]],
-            [0, 0, 1, self.translation[2]],
-            [0, 0, 0, 1]
-        ])
-
-        # Матрицы вращения
-        rx = radians(self.rotation[0])
-        ry = radians(self.rotation[1])
-        rz = radians(self.rotation[2])
-
-        rot_x = np.array([
-            [1, 0, 0, 0],
-            [0, cos(rx), -sin(rx), 0],
-            [0, sin(rx), cos(rx), 0],
-            [0, 0, 0, 1]
-        ])
-
-        rot_y = np.array([
-            [cos(ry), 0, sin(ry), 0],
-            [0, 1, 0, 0],
-            [-sin(ry), 0, cos(ry), 0],
-            [0, 0, 0, 1]
-        ])
-
-        rot_z = np.array([
-            [cos(rz), -sin(rz), 0, 0],
-            [sin(rz), cos(rz), 0, 0],
-            [0, 0, 1, 0],
-            [0, 0, 0, 1]
-        ])
-
-        # Матрица масштабирования
-        scale_mat = np.array([
-            [self.scale * self.zoom, 0, 0, 0],
-            [0, self.scale * self.zoom, 0, 0],
-            [0, 0, self.scale * self.zoom, 0],
-            [0, 0, 0, 1]
-        ])
-
-        # Порядок преобразований: масштаб -> вращение -> перемещение
-        return translate_mat @ rot_z @ rot_y @ rot_x @ scale_mat
+        parent = self.selected if self.attach_var.get() else None
+        node = self.scene.add(os.path.basename(file_path), load_mesh(file_path), parent)
+        self.update_node_list()
+        self.select_node(node)
+        self.request_render()
 
-    def update_3d_view(self):
-        self.canvas.delete("all")
-        if self.vertices.size == 0:
-            return
+    def update_node_list(self):
+        # Вложенность объектов показывается отступом
+        nodes = self.scene.nodes()
+        self.node_list = [node for node, _ in nodes]
+        self.node_box['values'] = ['    ' * (depth - 1) + node.name for node, depth in nodes]
+
+    def select_node(self, node):
+        self.selected = node
+        self.node_box.current(self.node_list.index(node))
+        # Ползунки показывают преобразование выбранного объекта
+        translation, rotation, scale = node.translation.copy(), node.rotation.copy(), node.scale
+        for slider, value in zip((self.tx, self.ty, self.tz), translation):
+            slider.set(value * 50)
+        for slider, value in zip((self.rx, self.ry, self.rz), rotation):
+            slider.set(value)
+        self.scale_slider.set(scale * 100)
+
+    def allocate_buffers(self, n):
+        # Буферы кадра выделяются один раз на размер сцены (уровень детализации) и переиспользуются
+        self.screen = np.empty((n, 2))
+        self.depth = np.empty(n)
+        self.depth_mask = np.empty(n, dtype=bool)
 
-        # Применяем преобразования
-        transform_matrix = self.get_transformation_matrix()
-        transformed = self.vertices @ transform_matrix.T
+    def project_vertices(self, vertices):
+        """Экранные координаты вершин в мировых координатах (без выделения памяти на кадр)"""
+        if len(self.screen) != len(vertices):
+            self.allocate_buffers(len(vertices))
 
         # Проекция
         if self.projection == 'perspective':
-            projected = self.perspective_project(transformed)
-        else:
-            projected = transformed[:, :2]
+            return self.perspective_project(vertices, out=self.screen)
 
-        # Масштабирование для отображения
-        display_scale = 50  # Фиксированный коэффициент визуализации
-        scaled = projected * display_scale
+        # Масштабирование для отображения и центрирование
+        np.multiply(vertices[:, :2], DISPLAY_SCALE, out=self.screen)
+        self.screen += SCREEN_CENTER
+        return self.screen
 
-        # Центрирование
-        centered = scaled + np.array([300, 300])
+    def request_render(self, interactive=False):
+        """Помечает вид устаревшим; перерисовка выполняется не чаще одного раза за кадр"""
+        if interactive and self.scene.simplified:
+            self.interacting = True
+            if self.idle_pending is not None:
+                self.root.after_cancel(self.idle_pending)
+            self.idle_pending = self.root.after(LOD_IDLE_DELAY, self.end_interaction)
+        if self.render_pending is not None:
+            return
+        elapsed = (time.perf_counter() - self.last_frame) * 1000
+        self.render_pending = self.root.after(max(0, int(FRAME_INTERVAL - elapsed)), self.render_frame)
 
-        # Отрисовка ребер
-        for edge in self.edges:
-            if edge[0] >= len(centered) or edge[1] >= len(centered):
-                continue
-            x1, y1 = centered[edge[0]]
-            x2, y2 = centered[edge[1]]
-            self.canvas.create_line(x1, y1, x2, y2, fill='black', width=2)
-
-        # Отрисовка вершин
-        for x, y in centered:
-            self.canvas.create_oval(x - 3, y - 3, x + 3, y + 3, fill='red')
-
-    def perspective_project(self, vertices):
-        result = []
-        for v in vertices:
-            x, y, z, w = v
-            z = z + 5  # Смещение для избежания деления на 0
-            if z != 0:
-                result.append([x / z, y / z])
-            else:
-                result.append([x, y])
-        return np.array(result)
-
-    def set_translation(self, dx, dy, dz):
-        self.translation = np.array([dx, dy, dz])
+    def render_frame(self):
+        self.render_pending = None
+        start = time.perf_counter()
         self.update_3d_view()
+        self.last_frame = time.perf_counter()
+        self.frame_time = self.last_frame - start
+
+        # Частота кадров - число отрисовок за последнюю секунду
+        self.frame_stamps.append(self.last_frame)
+        while self.frame_stamps[0] < self.last_frame - 1.0:
+            self.frame_stamps.popleft()
+        text = f"{len(self.frame_stamps)} FPS  {self.frame_time * 1000:.1f} мс"
+        if self.picked is not None:
+            node, index, level = self.picked
+            text += f"\n{node.name}: вершина {index}" + (" (упрощенная)" if level else "")
+        self.canvas.itemconfigure(self.stats_item, text=text)
+
+    def end_interaction(self):
+        self.idle_pending = None
+        self.interacting = False
+        self.request_render()
+
+    def update_3d_view(self):
+        self.framebuffer[:] = BACKGROUND_COLOR
+        self.pick_level = -1 if self.interacting else 0
+        vertices, edges, faces = self.scene.batch(self.pick_level)
+        camera = self.camera if self.projection == 'perspective' else None
+        if vertices.size != 0:
+            screen = self.project_vertices(vertices)
+            draw_mesh(self.framebuffer, self.zbuffer, screen, vertices, edges, faces, camera, self.hidden_lines)
+            self.pick_grid = ScreenGrid(screen)
+        if self.picked is not None:
+            node, index, level = self.picked
+            point = node.lods[level][0][index] @ node.world_matrix().T
+            rasterize_points(self.framebuffer, project_points(point[None], camera), PICK_COLOR, VERTEX_RADIUS + 2)
+        self.photo.configure(data=framebuffer_to_ppm(self.framebuffer), format='PPM')
+
+    def pick_vertex(self, x, y):
+        """Выбор вершины щелчком по экранной сетке последнего кадра"""
+        if self.pick_grid is None:
+            return
+        index = self.pick_grid.nearest(x, y)
+        if index is not None:
+            self.set_picked(*self.scene.locate(index, self.pick_level), self.pick_level)
+
+    def pick_ray(self, x, y):
+        """Выбор ближайшей к камере вершины на луче через точку экрана (BVH по мировым координатам)"""
+        vertices, _, _ = self.scene.batch(0)
+        if len(vertices) == 0:
+            return
+        if self.bvh is None or self.bvh_version != self.scene.version:
+            self.bvh = VertexBVH(vertices[:, :3])
+            self.bvh_version = self.scene.version
+
+        camera = self.camera if self.projection == 'perspective' else None
+        if camera is not None:
+            focal = camera.focal
+            origin = np.array([0.0, 0.0, -camera.distance])
+            direction = np.array([(x - SCREEN_CENTER[0]) / focal, (y - SCREEN_CENTER[1]) / focal, 1.0])
+            candidates = self.bvh.query(origin, direction, spread=PICK_RADIUS / focal)
+        else:
+            origin = np.array([(x - SCREEN_CENTER[0]) / DISPLAY_SCALE, (y - SCREEN_CENTER[1]) / DISPLAY_SCALE,
+                               self.bvh.lower[0, 2] - 1])
+            candidates = self.bvh.query(origin, np.array([0.0, 0.0, 1.0]), offset=PICK_RADIUS / DISPLAY_SCALE)
+        if len(candidates) == 0:
+            return
+
+        # Точный отбор кандидатов - по расстоянию на экране, из попавших берется ближайшая к камере
+        screen = project_points(vertices[candidates], camera)
+        hit = ((screen - [x, y]) ** 2).sum(axis=1) <= PICK_RADIUS * PICK_RADIUS
+        if hit.any():
+            candidates = candidates[hit]
+            index = int(candidates[np.argmin(vertices[candidates, 2])])
+            self.set_picked(*self.scene.locate(index), 0)
+
+    def set_picked(self, node, index, level):
+        self.picked = (node, index, level)
+        self.request_render()
+
+    def perspective_project(self, vertices, out=None):
+        if out is None:
+            out = np.empty((len(vertices), 2))
+
+        depth = self.camera.depth(vertices, out=self.depth)
+        visible = np.greater_equal(depth, self.camera.near, out=self.depth_mask)
+        visible &= depth <= self.camera.far
+
+        # Вершины вне ближней/дальней плоскостей не проецируются (NaN отбрасывается при отрисовке)
+        np.divide(vertices[:, :2], depth[:, None], out=out, where=visible[:, None])
+        out[~visible] = np.nan
+        out *= self.camera.focal
+        out += SCREEN_CENTER
+        return out
+
+    def set_translation(self, axis, value):
+        if self.selected is None:
+            return
+        translation = self.selected.translation.copy()
+        translation['xyz'.index(axis)] = value
+        self.selected.set_transform(translation=translation)
+        self.request_render(interactive=True)
 
     def set_rotation(self, axis, angle):
-        if axis == 'x':
-            self.rotation[0] = angle
-        elif axis == 'y':
-            self.rotation[1] = angle
-        elif axis == 'z':
-            self.rotation[2] = angle
-        self.update_3d_view()
+        if self.selected is None:
+            return
+        rotation = self.selected.rotation.copy()
+        rotation['xyz'.index(axis)] = angle
+        self.selected.set_transform(rotation=rotation)
+        self.request_render(interactive=True)
 
     def set_scale(self, scale):
-        self.scale = max(0.1, min(2.0, scale))
-        self.update_3d_view()
+        if self.selected is None:
+            return
+        self.selected.set_transform(scale=max(0.1, min(2.0, scale)))
+        self.request_render(interactive=True)
 
     def set_projection(self, proj):
         self.projection = proj
-        self.update_3d_view()
+        self.request_render()
+
+    def set_camera(self, fov=None, near=None, far=None):
+        if fov is not None:
+            self.camera.fov = fov
+        if near is not None:
+            self.camera.near = max(near, DEPTH_EPSILON)
+        if far is not None:
+            self.camera.far = far
+        self.request_render(interactive=True)
+
+    def set_hidden_lines(self, enabled):
+        self.hidden_lines = enabled
+        self.request_render()
 
     def reset_transforms(self):
-        self.translation = np.array([0.0, 0.0, 0.0])
-        self.rotation = np.array([0.0, 0.0, 0.0])
-        self.scale = 1.0
-        self.zoom = 1.0
+        if self.selected is not None:
+            self.selected.set_transform(np.zeros(3), np.zeros(3), 1.0)
         self.tx.set(0)
         self.ty.set(0)
         self.tz.set(0)
@@ -227,29 +1188,94 @@ class ThreeDEditor:
 
     def reset(self):
         self.reset_transforms()
-        self.update_3d_view()
+        self.request_render()
 
     def on_key_press(self, event):
         key = event.keysym.lower()
+        node = self.selected
+        if node is None:
+            return
         if key == 'w':
-            self.set_translation(self.translation[0], self.translation[1] + 0.1, self.translation[2])
+            self.set_translation('y', node.translation[1] + 0.1)
         elif key == 's':
-            self.set_translation(self.translation[0], self.translation[1] - 0.1, self.translation[2])
+            self.set_translation('y', node.translation[1] - 0.1)
         elif key == 'a':
-            self.set_translation(self.translation[0] - 0.1, self.translation[1], self.translation[2])
+            self.set_translation('x', node.translation[0] - 0.1)
         elif key == 'd':
-            self.set_translation(self.translation[0] + 0.1, self.translation[1], self.translation[2])
+            self.set_translation('x', node.translation[0] + 0.1)
         elif key == 'q':
-            self.set_rotation('y', (self.rotation[1] - 5) % 360)
+            self.set_rotation('y', (node.rotation[1] - 5) % 360)
         elif key == 'e':
-            self.set_rotation('y', (self.rotation[1] + 5) % 360)
+            self.set_rotation('y', (node.rotation[1] + 5) % 360)
         elif key == 'r':
-            self.set_scale(min(self.scale * 1.1, 2.0))
+            self.set_scale(min(node.scale * 1.1, 2.0))
         elif key == 'f':
-            self.set_scale(max(self.scale * 0.9, 0.1))
+            self.set_scale(max(node.scale * 0.9, 0.1))
+
+
+def report_frames(results):
+    for output in results:
+        if output is not None:
+            print(output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="3D-редактор; с файлами моделей - пакетная отрисовка кадров в PNG")
+    parser.add_argument('meshes', nargs='*', help="файлы моделей (без них запускается окно редактора)")
+    parser.add_argument('-o', '--output', default='frames', help="каталог для PNG")
+    parser.add_argument('--transform', action='append', type=parse_transform, metavar='TX,TY,TZ,RX,RY,RZ[,S]',
+                        help="преобразование одного кадра (можно повторять)")
+    parser.add_argument('--turntable', choices='xyz', help="полный оборот вокруг оси")
+    parser.add_argument('--frames', type=int, default=36, help="число кадров оборота")
+    parser.add_argument('--translate', type=float, nargs=3, default=(0.0, 0.0, 0.0), metavar=('X', 'Y', 'Z'))
+    parser.add_argument('--rotate', type=float, nargs=3, default=(0.0, 0.0, 0.0), metavar=('X', 'Y', 'Z'),
+                        help="углы в градусах")
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--perspective', action='store_true')
+    parser.add_argument('--fov', type=float, default=CAMERA_FOV)
+    parser.add_argument('--near', type=float, default=CAMERA_NEAR)
+    parser.add_argument('--far', type=float, default=CAMERA_FAR)
+    parser.add_argument('--hidden-lines', action='store_true', help="удаление невидимых линий")
+    parser.add_argument('--fit', action='store_true', help="вписать модель в кадр")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help="число процессов")
+    args = parser.parse_args(argv)
+
+    if not args.meshes:
+        root = tk.Tk()
+        ThreeDEditor(root)
+        root.mainloop()
+        return
+
+    camera = Camera(args.fov, args.near, args.far) if args.perspective else None
+    transforms = frame_transforms(args)
+    os.makedirs(args.output, exist_ok=True)
+
+    tasks = []
+    for path in args.meshes:
+        name = os.path.splitext(os.path.basename(path))[0]
+        for i, (translation, rotation, scale) in enumerate(transforms):
+            output = os.path.join(args.output, f"{name}_{i:04d}.png" if len(transforms) > 1 else f"{name}.png")
+            matrix = transformation_matrix(translation, rotation, scale)
+            tasks.append((path, output, matrix, camera, args.hidden_lines, args.fit))
+
+    if args.workers <= 1:
+        report_frames(map(render_task, tasks))
+        return
+
+    # Кеши моделей строятся до запуска пула: процессы только читают их и не пишут один файл наперегонки
+    broken = set()
+    for path in dict.fromkeys(args.meshes):
+        try:
+            load_mesh(path)
+        except Exception as error:
+            print(f"{path}: {type(error).__name__}: {error}", file=sys.stderr)
+            broken.add(path)
+    tasks = [task for task in tasks if task[0] not in broken]
+
+    # Кадры одной модели идут подряд, чтобы процесс пула загружал ее один раз
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        report_frames(pool.map(render_task, tasks, chunksize=max(1, len(tasks) // (args.workers * 4))))
 
 
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = ThreeDEditor(root)
-    root.mainloop()
\ No newline at end of file
+    main(sys.argv[1:])
\ No newline at end of file
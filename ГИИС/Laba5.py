@@ -1,11 +1,32 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from math import atan2, sqrt, isclose
+from math import cos, sin, sqrt, isclose, inf
 from enum import Enum
+from collections import defaultdict
+from bisect import bisect_left, bisect_right
+from fractions import Fraction
+from heapq import heapify, heappop, heappush
+from itertools import combinations
+import argparse
+import time
+import numpy as np
+from Laba3 import SpatialHash
 
 CELL_SIZE = 20
+POINT_RADIUS = 3
 CANVAS_WIDTH = 800
 CANVAS_HEIGHT = 600
+HULL_FILTER_DIRECTIONS = 16  # Число направлений для предварительного отсева точек оболочки
+SAFE_INT_SPAN = 1 << 30  # Размах целых координат, при котором векторные произведения в int64 не переполняются
+CHAN_MIN_GROUP = 256  # Начальный размер группы в алгоритме Чана (2^(2^3))
+BENCHMARK_SIZES = (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6)
+BENCHMARK_TIME_LIMIT = 30.0  # с; метод, который по прогнозу превысит лимит на следующем n, пропускается
+PIP_CHUNK = 1 << 20  # Пар точка - ребро в одном блоке векторной проверки принадлежности
+RTREE_NODE_SIZE = 16  # Детей в узле R-дерева габаритов
+RTREE_PENDING_LIMIT = 64  # Минимум измененных габаритов, после которого дерево перепаковывается
+BOOLEAN_PERTURBATION = 1e-9  # Сдвиг clip (доля размаха координат) при вырожденных пересечениях
+BOOLEAN_PERTURB_ATTEMPTS = 8
+HULL_BLOCK_SIZE = 64  # Вершин в блоке цепочки DynamicHull; блок длиннее вдвое делится пополам
 
 
 class Algorithm(Enum):
@@ -15,8 +36,16 @@ class Algorithm(Enum):
 
 
 class HullMethod(Enum):
-    GRAHAM = "graham"
+    MONOTONE_CHAIN = "monotone_chain"
     JARVIS = "jarvis"
+    QUICKHULL = "quickhull"
+    CHAN = "chan"
+
+
+class BooleanOperation(Enum):
+    INTERSECTION = "intersection"
+    UNION = "union"
+    DIFFERENCE = "difference"
 
 
 def draw_grid(canvas):
@@ -26,6 +55,1067 @@ def draw_grid(canvas):
         canvas.create_line(0, y, CANVAS_WIDTH, y, fill='#ddd')
 
 
+def as_points(points):
+    """Массив точек (N, 2): целые координаты остаются целыми, остальные - float64
+
+    Целые хранятся в int64, если размах координат не больше SAFE_INT_SPAN, иначе - целыми Python
+    (dtype=object): векторные произведения остаются точными ценой скорости.
+    """
+    points = np.asarray(points)
+    integer = points.dtype.kind in 'iub' or (
+        points.dtype.kind == 'O' and all(isinstance(v, (int, np.integer)) for v in points.flat))
+    if not integer:
+        return points.astype(np.float64).reshape(-1, 2)
+    if points.size and int(points.max()) - int(points.min()) > SAFE_INT_SPAN:
+        return np.array([int(v) for v in points.flat], dtype=object).reshape(-1, 2)
+    return points.astype(np.int64).reshape(-1, 2)
+
+
+def sorted_unique(points):
+    """Уникальные точки в лексикографическом порядке (x, затем y)"""
+    points = points[np.lexsort((points[:, 1], points[:, 0]))]
+    keep = np.ones(len(points), dtype=bool)
+    keep[1:] = (points[1:] != points[:-1]).any(axis=1)
+    return points[keep]
+
+
+def cross_product(a, b, c):
+    return (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+
+
+def hull_candidates(points):
+    """Отсев точек, которые не могут быть вершинами выпуклой оболочки (векторно)
+
+    Возвращает массив уникальных точек в лексикографическом порядке (x, затем y) без точек
+    строго внутри многоугольника крайних точек и в каждом столбце x только с крайними по y.
+    """
+    points = as_points(points)
+    if len(points) == 0:
+        return points
+
+    # Целые точки в небольшой области упорядочиваются и прореживаются картой занятости, без сортировки.
+    # Площадь области считается в целых Python: в int64 она переполняется при большом размахе
+    lower = points.min(axis=0)
+    span = points.max(axis=0) - lower + 1
+    area = int(span[0]) * int(span[1]) if points.dtype.kind == 'i' else None
+    presorted = area is not None and area <= max(4 * len(points), 1 << 20)
+    if presorted:
+        occupied = np.zeros(area, dtype=bool)
+        occupied[(points[:, 0] - lower[0]) * span[1] + (points[:, 1] - lower[1])] = True
+        keys = np.flatnonzero(occupied)
+        points = np.column_stack([keys // span[1] + lower[0], keys % span[1] + lower[1]])
+
+    # Отсечение Экла - Туссена: многоугольник из крайних точек в HULL_FILTER_DIRECTIONS направлениях
+    # лежит внутри оболочки, точки строго внутри него отбрасываются (проверка точная - по самим точкам)
+    if len(points) > 4 * HULL_FILTER_DIRECTIONS:
+        x, y = points[:, 0], points[:, 1]
+        angles = np.linspace(0, 2 * np.pi, HULL_FILTER_DIRECTIONS, endpoint=False)
+        extremes = np.unique([np.argmax(x * cos(angle) + y * sin(angle)) for angle in angles])
+        polygon = monotone_chain(points[extremes])
+        if len(polygon) >= 3:
+            inside = np.ones(len(points), dtype=bool)
+            for (ax, ay), (bx, by) in zip(polygon, polygon[1:] + polygon[:1]):
+                inside &= (bx - ax) * (y - ay) - (by - ay) * (x - ax) > 0
+            points = points[~inside]
+
+    if not presorted:
+        # Лексикографическая сортировка; целые точки int64 сортируются по одному ключу
+        if area is not None and area < 2 ** 62:
+            points = points[np.argsort((points[:, 0] - lower[0]) * span[1] + (points[:, 1] - lower[1]))]
+            keep = np.ones(len(points), dtype=bool)
+            keep[1:] = (points[1:] != points[:-1]).any(axis=1)
+            points = points[keep]
+        else:
+            points = sorted_unique(points)
+
+    # Внутри столбца вершиной может быть только нижняя или верхняя точка
+    x = points[:, 0]
+    column_edge = np.ones(len(points), dtype=bool)
+    column_edge[1:-1] = (x[1:-1] != x[:-2]) | (x[1:-1] != x[2:])
+    return points[column_edge]
+
+
+def half_hull(sequence):
+    # Нижняя (для обратного порядка - верхняя) цепочка лексикографически упорядоченных точек
+    chain = []
+    for p in sequence:
+        while len(chain) >= 2 and ((chain[-1][0] - chain[-2][0]) * (p[1] - chain[-2][1]) -
+                                   (chain[-1][1] - chain[-2][1]) * (p[0] - chain[-2][0])) <= 0:
+            chain.pop()
+        chain.append(p)
+    return chain
+
+
+def reference_hull(points):
+    """Эталон для проверки методов: монотонная цепочка по всем точкам в числах Python, без векторного отсева"""
+    points = sorted(set(map(tuple, as_points(points).tolist())))
+    if len(points) < 3:
+        return points
+    return half_hull(points)[:-1] + half_hull(reversed(points))[:-1]
+
+
+def monotone_chain(points):
+    """Выпуклая оболочка методом Эндрю (монотонная цепочка) против часовой стрелки, без коллинеарных точек
+
+    Для целых координат все векторные произведения вычисляются точно (целые Python).
+    """
+    candidates = hull_candidates(points).tolist()
+    if len(candidates) < 3:
+        return [tuple(p) for p in candidates]
+
+    lower = half_hull(candidates)
+    upper = half_hull(reversed(candidates))
+    return [tuple(p) for p in lower[:-1] + upper[:-1]]
+
+
+def jarvis_march(points):
+    """Заворачивание подарка (Джарвис), O(nh); из коллинеарных кандидатов берется дальний"""
+    points = sorted(set(map(tuple, as_points(points).tolist())))
+    if len(points) < 3:
+        return points
+
+    def distance(a, b):
+        return (b[0] - a[0]) ** 2 + (b[1] - a[1]) ** 2
+
+    start = points[0]
+    hull = []
+    current = start
+    while True:
+        hull.append(current)
+        next_point = points[1] if current == points[0] else points[0]
+        for candidate in points:
+            turn = cross_product(current, next_point, candidate)
+            if turn < 0 or (turn == 0 and distance(current, candidate) > distance(current, next_point)):
+                next_point = candidate
+
+        if next_point == start:
+            break
+        current = next_point
+
+    return hull
+
+
+def quickhull(points):
+    """QuickHull: точки делятся по сторонам хорды одним векторным проходом на каждую найденную вершину
+
+    Порядок обхода тот же, что у monotone_chain: против часовой стрелки от лексикографически минимальной точки.
+    """
+    points = as_points(points)
+    if len(points) < 3:
+        return monotone_chain(points)
+    order = np.lexsort((points[:, 1], points[:, 0]))
+    first, last = points[order[0]], points[order[-1]]
+    if (first == last).all():
+        return [tuple(first.tolist())]
+
+    def side(a, b, candidates):
+        # > 0 - точка слева от направленной хорды a -> b
+        return (b[0] - a[0]) * (candidates[:, 1] - a[1]) - (b[1] - a[1]) * (candidates[:, 0] - a[0])
+
+    turn = side(first, last, points)
+    hull = []
+    # Стек вместо рекурсии (глубина доходит до числа вершин): вершины и хорды (a, b, точки строго справа от a -> b)
+    stack = [(last, first, points[turn > 0]), last, (first, last, points[turn < 0]), first]
+    while stack:
+        item = stack.pop()
+        if not isinstance(item, tuple):
+            hull.append(tuple(item.tolist()))
+            continue
+
+        a, b, candidates = item
+        if len(candidates) == 0:
+            continue
+        # Самая далекая от хорды точка; из нескольких на одной параллельной прямой - ближняя к a (она вершина)
+        distance = side(a, b, candidates)
+        farthest = candidates[distance == distance.min()]
+        far = farthest[np.argmin((farthest - a) @ (b - a))]
+        stack.append((far, b, candidates[side(far, b, candidates) < 0]))
+        stack.append(far)
+        stack.append((a, far, candidates[side(a, far, candidates) < 0]))
+
+    return hull
+
+
+def hull_tangents(vertices, offsets, sizes, p):
+    """Касательные из точки p к выпуклым многоугольникам - двоичный поиск сразу по всем многоугольникам
+
+    Многоугольник k - вершины vertices[offsets[k]:offsets[k] + sizes[k]] против часовой стрелки.
+    Для каждого возвращается индекс вершины q, такой что весь многоугольник лежит не правее луча p -> q
+    (из коллинеарных с p - дальняя). Точка p должна лежать вне многоугольников.
+    """
+    dx, dy = vertices[:, 0] - p[0], vertices[:, 1] - p[1]
+
+    def turn(i, j):
+        return dx[i] * dy[j] - dy[i] * dx[j]
+
+    def vertex(k, i):
+        return offsets[k] + i % sizes[k]
+
+    def is_tangent(k, i):
+        v = vertex(k, i)
+        return (turn(v, vertex(k, i - 1)) >= 0) & (turn(v, vertex(k, i + 1)) >= 0)
+
+    # Угол вершины, видимый из p, вдоль многоугольника растет до левой касательной и убывает до правой.
+    # Искомый минимум ищется сравнением середины отрезка поиска с вершиной 0 и наклона в середине
+    polygons = np.arange(len(sizes))
+    result = np.zeros(len(sizes), dtype=np.int64)
+    rising = turn(offsets, vertex(polygons, 1)) > 0
+    active = polygons[~is_tangent(polygons, 0)]
+    lo, hi = np.ones(len(active), dtype=np.int64), sizes[active].astype(np.int64)
+    while len(active):
+        middle = (lo + hi) // 2
+        found = is_tangent(active, middle)
+        result[active[found]] = middle[found]
+
+        v = vertex(active, middle)
+        ascending = turn(v, vertex(active, middle + 1)) > 0
+        below = turn(offsets[active], v) < 0
+        right = np.where(rising[active], ~ascending | ~below, ~ascending & below)
+        lo, hi = np.where(right, middle + 1, lo), np.where(right, hi, middle)
+
+        exhausted = ~found & (lo >= hi)
+        result[active[exhausted]] = lo[exhausted]
+        searching = ~found & ~exhausted
+        active, lo, hi = active[searching], lo[searching], hi[searching]
+
+    # Из двух вершин на одном луче из p берется дальняя
+    tangent = vertex(polygons, result)
+    distance = dx ** 2 + dy ** 2
+    for neighbour in (vertex(polygons, result + 1), vertex(polygons, result - 1)):
+        farther = (turn(tangent, neighbour) == 0) & (distance[neighbour] > distance[tangent])
+        tangent = np.where(farther, neighbour, tangent)
+    return tangent
+
+
+def chan_hull(points):
+    """Алгоритм Чана, O(n log h): оболочки групп по m точек и обход Джарвиса по касательным к ним
+
+    Если обход не замкнулся за m шагов, m возводится в квадрат. Начальное m = CHAN_MIN_GROUP, а не 4:
+    оболочки групп строятся вызовами из Python, и мелкие группы стоили бы дороже самого обхода.
+    """
+    points = sorted_unique(as_points(points))
+    if len(points) < 3:
+        return [tuple(p) for p in points.tolist()]
+
+    group = CHAN_MIN_GROUP
+    while group < len(points):
+        hull = chan_wrap(points, group)
+        if hull is not None:
+            return hull
+        group *= group
+    # Одна группа - ее оболочка и есть ответ
+    return monotone_chain(points)
+
+
+def chan_wrap(points, group):
+    """Один проход алгоритма Чана; None, если оболочка больше group вершин"""
+    polygons = [monotone_chain(points[i:i + group]) for i in range(0, len(points), group)]
+    sizes = np.array([len(polygon) for polygon in polygons])
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    vertices = np.array([p for polygon in polygons for p in polygon], dtype=points.dtype)
+
+    # Лексикографически минимальная точка - вершина 0 первой группы и заведомо вершина оболочки
+    hull = []
+    own, position = 0, 0
+    for _ in range(group):
+        current = offsets[own] + position
+        hull.append(current)
+        p = vertices[current]
+        candidates = hull_tangents(vertices, offsets, sizes, p)
+        candidates[own] = offsets[own] + (position + 1) % sizes[own]
+
+        # Турнир кандидатов: побеждает самый правый луч из p, при равенстве - дальняя точка
+        dx, dy = vertices[:, 0] - p[0], vertices[:, 1] - p[1]
+        while len(candidates) > 1:
+            half = len(candidates) // 2
+            a, b = candidates[:half], candidates[half:2 * half]
+            turn = dx[a] * dy[b] - dy[a] * dx[b]
+            better = (turn < 0) | ((turn == 0) & (dx[b] ** 2 + dy[b] ** 2 > dx[a] ** 2 + dy[a] ** 2))
+            candidates = np.concatenate([np.where(better, b, a), candidates[2 * half:]])
+
+        best = candidates[0]
+        if best == 0:
+            return [tuple(p) for p in vertices[hull].tolist()]
+        own = np.searchsorted(offsets, best, side='right') - 1
+        position = best - offsets[own]
+    return None
+
+
+HULL_ALGORITHMS = {
+    HullMethod.MONOTONE_CHAIN: monotone_chain,
+    HullMethod.JARVIS: jarvis_march,
+    HullMethod.QUICKHULL: quickhull,
+    HullMethod.CHAN: chan_hull,
+}
+
+
+class HalfHull:
+    """Нижняя цепочка выпуклой оболочки: вершины по возрастанию x, между соседними - только левые повороты
+
+    Вершины (x, y) лежат блоками не длиннее 2 * HULL_BLOCK_SIZE, для блоков хранится x последней вершины.
+    Место точки ищется двоичным поиском по блокам и внутри блока - O(log h); вставка и удаление сдвигают
+    только один блок, а список блоков меняется лишь при делении или опустошении блока.
+    Позиция вершины - пара (номер блока, индекс в блоке).
+    """
+
+    def __init__(self):
+        self.blocks = []
+        self.maxes = []
+
+    def __iter__(self):
+        for block in self.blocks:
+            yield from block
+
+    def locate(self, x):
+        """Позиция первой вершины с абсциссой >= x; (len(blocks), 0), если такой нет"""
+        b = bisect_left(self.maxes, x)
+        if b == len(self.blocks):
+            return b, 0
+        return b, bisect_left(self.blocks[b], x, key=lambda vertex: vertex[0])
+
+    def vertex(self, position):
+        b, k = position
+        return self.blocks[b][k] if b < len(self.blocks) else None
+
+    def previous(self, position):
+        b, k = position
+        if k > 0:
+            return b, k - 1
+        return (b - 1, len(self.blocks[b - 1]) - 1) if b > 0 else None
+
+    def next(self, position):
+        b, k = position
+        if k + 1 < len(self.blocks[b]):
+            return b, k + 1
+        return (b + 1, 0) if b + 1 < len(self.blocks) else None
+
+    def put(self, position, vertex):
+        """Вставляет вершину перед позицией и возвращает ее позицию"""
+        if not self.blocks:
+            self.blocks.append([vertex])
+            self.maxes.append(vertex[0])
+            return 0, 0
+        b, k = position
+        if b == len(self.blocks):
+            b -= 1
+            k = len(self.blocks[b])
+        block = self.blocks[b]
+        block.insert(k, vertex)
+        self.maxes[b] = block[-1][0]
+        if len(block) > 2 * HULL_BLOCK_SIZE:
+            # Переполненный блок делится пополам
+            self.blocks[b:b + 1] = block[:HULL_BLOCK_SIZE], block[HULL_BLOCK_SIZE:]
+            self.maxes[b:b + 1] = self.blocks[b][-1][0], self.blocks[b + 1][-1][0]
+            if k >= HULL_BLOCK_SIZE:
+                b, k = b + 1, k - HULL_BLOCK_SIZE
+        return b, k
+
+    def remove(self, position):
+        b, k = position
+        block = self.blocks[b]
+        del block[k]
+        if block:
+            self.maxes[b] = block[-1][0]
+        else:
+            del self.blocks[b], self.maxes[b]
+
+    def contains(self, x, y):
+        return self.vertex(self.locate(x)) == (x, y)
+
+    def insert(self, x, y):
+        """Добавляет точку; False, если цепочка не изменилась"""
+        point = (x, y)
+        position = self.locate(x)
+        at = self.vertex(position)
+        if at is not None and at[0] == x:
+            # В столбце на цепочке остается только нижняя точка
+            if at[1] <= y:
+                return False
+            self.remove(position)
+            position = self.locate(x)
+        elif at is not None:
+            before = self.previous(position)
+            if before is not None and cross_product(self.vertex(before), point, at) <= 0:
+                return False  # Точка не ниже цепочки
+
+        self.put(position, point)
+        # Соседи, ставшие невыпуклыми, удаляются; каждая вершина удаляется не больше одного раза.
+        # После удаления позиции в блоке сдвигаются, поэтому точка ищется заново
+        while True:
+            first = self.previous(self.locate(x))
+            second = first and self.previous(first)
+            if second is None or cross_product(self.vertex(second), self.vertex(first), point) > 0:
+                break
+            self.remove(first)
+        while True:
+            first = self.next(self.locate(x))
+            second = first and self.next(first)
+            if second is None or cross_product(point, self.vertex(first), self.vertex(second)) > 0:
+                break
+            self.remove(first)
+        return True
+
+
+class DynamicHull:
+    """Выпуклая оболочка, пополняемая по одной точке: нижняя цепочка и верхняя (как нижняя для (-x, -y))
+
+    Удалять точки нельзя - после перемещения вершины оболочку строят заново из всех точек.
+    """
+
+    def __init__(self, points=()):
+        self.lower = HalfHull()
+        self.upper = HalfHull()
+        for x, y in points:
+            self.insert(x, y)
+
+    def insert(self, x, y):
+        """Добавляет точку; True, если оболочка изменилась"""
+        changed = self.lower.insert(x, y)
+        return self.upper.insert(-x, -y) or changed
+
+    def is_vertex(self, x, y):
+        return self.lower.contains(x, y) or self.upper.contains(-x, -y)
+
+    def vertices(self):
+        """Вершины против часовой стрелки от лексикографически минимальной, как у monotone_chain"""
+        lower = list(self.lower)
+        upper = [(-x, -y) for x, y in self.upper]
+        if lower and upper[0] == lower[-1]:
+            upper = upper[1:]
+        if upper and upper[-1] == lower[0]:
+            upper = upper[:-1]
+        return lower + upper
+
+
+def index_ranges(starts, counts):
+    """Индексы отрезков [start, start + count) подряд одним массивом"""
+    return np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+
+
+def segment_crossing(s, t):
+    """Единственная общая точка отрезков s и t (точно, Fraction) или None; параллельные дают None"""
+    (x1, y1), (x2, y2) = s
+    (x3, y3), (x4, y4) = t
+    denom = (x2 - x1) * (y4 - y3) - (y2 - y1) * (x4 - x3)
+    if denom == 0:
+        return None
+    ua = (x3 - x1) * (y4 - y3) - (y3 - y1) * (x4 - x3)
+    ub = (x3 - x1) * (y2 - y1) - (y3 - y1) * (x2 - x1)
+    if denom < 0:
+        denom, ua, ub = -denom, -ua, -ub
+    if not (0 <= ua <= denom and 0 <= ub <= denom):
+        return None
+    return x1 + Fraction(ua * (x2 - x1), denom), y1 + Fraction(ua * (y2 - y1), denom)
+
+
+def sweep_intersections(segments, adjacent=None):
+    """Все точки пересечения отрезков заметающей прямой Бентли - Оттмана, O((n + k) log n)
+
+    segments - пары концов ((x1, y1), (x2, y2)) с целыми координатами; вычисления точные (Fraction).
+    adjacent - словарь {frozenset((i, j)): общая вершина} соседних ребер: в ней пересечение не отмечается.
+    Возвращает список (точка, индексы отрезков через нее) в порядке заметания (x, затем y);
+    коллинеарное перекрытие отмечается точками на концах перекрытия.
+    """
+    segments = [tuple(sorted(segment)) for segment in segments]  # Левый (лексикографически) конец первым
+    starts = defaultdict(list)
+    for i, (a, b) in enumerate(segments):
+        if a != b:
+            starts[a].append(i)
+    adjacent = adjacent or {}
+    events = list({end for ids in starts.values() for i in ids for end in segments[i]})
+    heapify(events)
+    queued = set(events)
+    status = []  # Отрезки, пересекающие заметающую прямую, снизу вверх
+    result = []
+
+    def slope(i):
+        (x1, y1), (x2, y2) = segments[i]
+        return Fraction(y2 - y1, x2 - x1) if x1 != x2 else inf
+
+    def schedule(i, j, point):
+        crossing = segment_crossing(segments[i], segments[j])
+        if crossing is not None and crossing > point and crossing not in queued:
+            queued.add(crossing)
+            heappush(events, crossing)
+
+    def ignored(i, j, point):
+        return adjacent.get(frozenset((i, j))) == point
+
+    while events:
+        point = heappop(events)
+        px, py = point
+
+        def height(i):
+            # Вертикальный отрезок в статусе всегда проходит через текущее событие
+            (x1, y1), (x2, y2) = segments[i]
+            return y1 + Fraction((px - x1) * (y2 - y1), x2 - x1) if x1 != x2 else py
+
+        # Отрезки статуса через точку события идут подряд
+        lo = bisect_left(status, py, key=height)
+        hi = bisect_right(status, py, lo=lo, key=height)
+        through = status[lo:hi] + starts.get(point, [])
+        crossed = {k for i, j in combinations(through, 2) if not ignored(i, j, point) for k in (i, j)}
+        if crossed:
+            result.append((point, sorted(crossed)))
+
+        # Проходящие дальше отрезки переставляются в порядке правее точки - по наклону
+        inserted = sorted((i for i in through if segments[i][1] != point), key=slope)
+        status[lo:hi] = inserted
+        after = lo + len(inserted)
+        if inserted:
+            if lo > 0:
+                schedule(status[lo - 1], inserted[0], point)
+            if after < len(status):
+                schedule(inserted[-1], status[after], point)
+        elif 0 < lo < len(status):
+            schedule(status[lo - 1], status[lo], point)
+
+    return result
+
+
+class PolygonEdges:
+    """Ребра набора полигонов: все попарные пересечения (заметание, кэшируется) и запрос отрезка
+
+    Запрос отрезка проверяет сразу все ребра массивами NumPy, без цикла по полигонам.
+    """
+
+    def __init__(self, polygons):
+        self.segments = []
+        self.owners = []  # (индекс полигона, индекс ребра)
+        self.starts = np.cumsum([0] + [len(polygon) for polygon in polygons])  # Ребра полигона i - starts[i]:starts[i + 1]
+        self.adjacent = {}  # Соседние ребра -> общая вершина
+        for poly_idx, polygon in enumerate(polygons):
+            first = len(self.segments)
+            n = len(polygon)
+            for i in range(n):
+                self.segments.append((tuple(polygon[i]), tuple(polygon[(i + 1) % n])))
+                self.owners.append((poly_idx, i))
+                self.adjacent[frozenset((first + i, first + (i + 1) % n))] = tuple(polygon[(i + 1) % n])
+        self.array = np.array(self.segments, dtype=np.float64).reshape(-1, 4)
+        self.crossings = None
+
+    def intersections(self):
+        if self.crossings is None:
+            self.crossings = sweep_intersections(self.segments, self.adjacent)
+        return self.crossings
+
+    def query(self, p1, p2, polygons=None):
+        """Точки пересечения отрезка p1-p2 с каждым ребром (коллинеарные ребра не учитываются), массив (K, 2)
+
+        polygons - индексы полигонов-кандидатов (по возрастанию), остальные ребра не проверяются.
+        """
+        (x1, y1), (x2, y2) = p1, p2
+        array = self.array
+        if polygons is not None:
+            polygons = np.asarray(polygons, dtype=np.int64)
+            array = array[index_ranges(self.starts[polygons], self.starts[polygons + 1] - self.starts[polygons])]
+        x3, y3, x4, y4 = array.T
+        denom = (y4 - y3) * (x2 - x1) - (x4 - x3) * (y2 - y1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ua = ((x4 - x3) * (y1 - y3) - (y4 - y3) * (x1 - x3)) / denom
+            ub = ((x2 - x1) * (y1 - y3) - (y2 - y1) * (x1 - x3)) / denom
+        hit = (denom != 0) & (ua >= 0) & (ua <= 1) & (ub >= 0) & (ub <= 1)
+        return np.column_stack([x1 + ua[hit] * (x2 - x1), y1 + ua[hit] * (y2 - y1)])
+
+
+def points_in_polygon(points, polygon):
+    """Принадлежность точек (M, 2) многоугольнику (N, 2) - маска (M,), граница считается внутренней
+
+    Луч вправо от точки, сразу для всех пар точка - ребро (блоками не больше PIP_CHUNK пар).
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    polygon = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+    inside = np.zeros(len(points), dtype=bool)
+    if len(polygon) == 0:
+        return inside
+
+    x1, y1 = polygon[:, 0], polygon[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    chunk = max(1, PIP_CHUNK // len(polygon))
+    for start in range(0, len(points), chunk):
+        x = points[start:start + chunk, 0:1]
+        y = points[start:start + chunk, 1:2]
+        cross = (x2 - x1) * (y - y1) - (y2 - y1) * (x - x1)
+        on_edge = ((np.abs(cross) <= 1e-10) & (np.minimum(x1, x2) <= x) & (x <= np.maximum(x1, x2)) &
+                   (np.minimum(y1, y2) <= y) & (y <= np.maximum(y1, y2)))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            crossing = ((y1 > y) != (y2 > y)) & (x <= (y - y1) * (x2 - x1) / (y2 - y1) + x1)
+        inside[start:start + chunk] = on_edge.any(axis=1) | (np.count_nonzero(crossing, axis=1) % 2 == 1)
+    return inside
+
+
+class SlabIndex:
+    """Разбиение многоугольника горизонталями через вершины для проверки точек за O(log n)
+
+    В полосе ys[k] <= y < ys[k + 1] нет вершин, и ребра, пересекающие ее, упорядочены по x: четность числа
+    ребер правее точки находится двоичным поиском (сразу для всех точек запроса). Полосы, где ребра
+    пересекаются (многоугольник с самопересечениями), проверяются перебором через points_in_polygon.
+    Память - O(n^2) в худшем случае, для обычных многоугольников близко к O(n).
+    """
+
+    def __init__(self, polygon):
+        self.polygon = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+        x1, y1 = self.polygon[:, 0], self.polygon[:, 1]
+        x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+        self.ys = np.unique(y1)
+        self.vertices = x1 + 1j * y1
+
+        # Горизонтальные ребра не попадают ни в одну полосу - для них отдельная проверка границы
+        flat = y1 == y2
+        self.flat_y = y1[flat]
+        self.flat_x0, self.flat_x1 = np.minimum(x1, x2)[flat], np.maximum(x1, x2)[flat]
+
+        # Ребро занимает полосы с first по last - 1
+        sloped = np.flatnonzero(~flat)
+        first = np.searchsorted(self.ys, np.minimum(y1, y2)[sloped])
+        last = np.searchsorted(self.ys, np.maximum(y1, y2)[sloped])
+        edges = np.repeat(sloped, last - first)
+        slabs = index_ranges(first, last - first)
+
+        def x_at(y):
+            return x1[edges] + (y - y1[edges]) * (x2[edges] - x1[edges]) / (y2[edges] - y1[edges])
+
+        bottom, top = self.ys[slabs], self.ys[np.minimum(slabs + 1, len(self.ys) - 1)]
+        order = np.lexsort((x_at((bottom + top) / 2), slabs))
+        edges, slabs, bottom, top = edges[order], slabs[order], bottom[order], top[order]
+        self.x1, self.y1, self.x2, self.y2 = x1[edges], y1[edges], x2[edges], y2[edges]
+        self.offsets = np.searchsorted(slabs, np.arange(len(self.ys) + 1))
+
+        # Порядок по x внутри полосы должен сохраняться и на ее границах (допуск - на общие вершины)
+        low, high = x_at(bottom), x_at(top)
+        tolerance = 1e-9 * (1 + np.abs(low[1:]) + np.abs(high[1:]))
+        tangled = (slabs[1:] == slabs[:-1]) & ((low[1:] < low[:-1] - tolerance) | (high[1:] < high[:-1] - tolerance))
+        self.tangled = np.zeros(len(self.ys), dtype=bool)
+        self.tangled[slabs[1:][tangled]] = True
+
+    def contains(self, points):
+        """Маска принадлежности точек (M, 2) многоугольнику, совпадает с points_in_polygon"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        x, y = points[:, 0], points[:, 1]
+        inside = np.isin(x + 1j * y, self.vertices)
+        on_flat = np.flatnonzero(np.isin(y, self.flat_y))
+        if len(on_flat):
+            px, py = x[on_flat, None], y[on_flat, None]
+            inside[on_flat] |= ((py == self.flat_y) & (self.flat_x0 <= px) & (px <= self.flat_x1)).any(axis=1)
+
+        slab = np.searchsorted(self.ys, y, side='right') - 1
+        valid = (slab >= 0) & (slab < len(self.ys) - 1)
+        tangled = np.zeros(len(points), dtype=bool)
+        tangled[valid] = self.tangled[slab[valid]]
+        inside[tangled] |= points_in_polygon(points[tangled], self.polygon)
+
+        # Двоичный поиск первого ребра полосы с x пересечения >= x точки, сразу для всех точек
+        query = np.flatnonzero(valid & ~tangled)
+        qx, qy = x[query], y[query]
+        start, end = self.offsets[slab[query]], self.offsets[slab[query] + 1]
+        lo, hi = start.copy(), end.copy()
+        while True:
+            active = lo < hi
+            if not active.any():
+                break
+            middle = np.minimum((lo + hi) // 2, len(self.x1) - 1)
+            x_cross = (qy - self.y1[middle]) * (self.x2[middle] - self.x1[middle]) / (self.y2[middle] - self.y1[middle])
+            right = active & (x_cross + self.x1[middle] < qx)
+            lo = np.where(right, middle + 1, lo)
+            hi = np.where(active & ~right, middle, hi)
+        result = (end - lo) % 2 == 1
+
+        # Точка на ребре - это одно из двух ребер по сторонам от найденной позиции
+        for edge in (lo - 1, lo):
+            near = (edge >= start) & (edge < end)
+            edge = np.clip(edge, 0, max(len(self.x1) - 1, 0))[near]
+            ex1, ey1, ex2, ey2 = self.x1[edge], self.y1[edge], self.x2[edge], self.y2[edge]
+            cross = (ex2 - ex1) * (qy[near] - ey1) - (ey2 - ey1) * (qx[near] - ex1)
+            result[near] |= ((np.abs(cross) <= 1e-10) & (np.minimum(ex1, ex2) <= qx[near]) &
+                             (qx[near] <= np.maximum(ex1, ex2)))
+        inside[query] |= result
+        return inside
+
+
+def next_vertex(owner, sizes):
+    """Индекс следующей по кругу вершины того же многоугольника (вершины многоугольников идут подряд)"""
+    starts = np.cumsum(sizes) - sizes
+    return starts[owner] + (np.arange(len(owner)) - starts[owner] + 1) % sizes[owner]
+
+
+def polygon_rings(polygons):
+    """Вершины всех многоугольников одним массивом без повторяющихся соседних вершин
+
+    Возвращает (points, owner, following): номер многоугольника каждой вершины и индекс следующей
+    по кругу вершины того же многоугольника.
+    """
+    sizes = np.array([len(polygon) for polygon in polygons], dtype=np.int64)
+    points = np.concatenate([np.asarray(polygon, dtype=np.float64).reshape(-1, 2) for polygon in polygons] +
+                            [np.empty((0, 2))])
+    owner = np.repeat(np.arange(len(polygons)), sizes)
+
+    # Повтор вершины (двойной клик в ту же ячейку) не должен давать нулевое ребро
+    keep = (points != points[next_vertex(owner, sizes)]).any(axis=1) | (sizes[owner] == 1)
+    points, owner = points[keep], owner[keep]
+    return points, owner, next_vertex(owner, np.bincount(owner, minlength=len(polygons)))
+
+
+def polygons_convexity(polygons):
+    """Выпуклость сразу всех многоугольников - векторно по всем вершинам
+
+    Выпуклый: все ненулевые повороты (|векторное произведение| > 1e-10) одного знака, нет возвратов назад
+    по той же прямой и полный поворот ровно на 360° (звездчатые многоугольники не выпуклые).
+    Коллинеарные вершины допускаются, вырожденный (все вершины на одной прямой) - не выпуклый.
+    """
+    points, owner, following = polygon_rings(polygons)
+    edge = points[following] - points
+    after = edge[following]
+    cross = edge[:, 0] * after[:, 1] - edge[:, 1] * after[:, 0]
+    dot = (edge * after).sum(axis=1)
+    turning = np.bincount(owner, np.arctan2(cross, dot), minlength=len(polygons))
+    positive = np.bincount(owner, cross > 1e-10, minlength=len(polygons))
+    negative = np.bincount(owner, cross < -1e-10, minlength=len(polygons))
+    backtracks = np.bincount(owner, (np.abs(cross) <= 1e-10) & (dot < 0), minlength=len(polygons))
+    return (((positive == 0) != (negative == 0)) & (backtracks == 0) &
+            (np.abs(np.abs(turning) - 2 * np.pi) < 1e-6))
+
+
+class ConvexPolygon:
+    """Выпуклый многоугольник с проверкой точек за O(log n): двоичный поиск сектора веера из вершины 0"""
+
+    def __init__(self, polygon):
+        points, _, following = polygon_rings([polygon])
+        edge = points[following] - points
+        before = np.roll(edge, 1, axis=0)
+        # Коллинеарные вершины не нужны; обход - против часовой стрелки
+        vertices = points[np.abs(before[:, 0] * edge[:, 1] - before[:, 1] * edge[:, 0]) > 1e-10]
+        x, y = vertices[:, 0], vertices[:, 1]
+        if np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)) < 0:
+            vertices = vertices[::-1]
+        self.vertices = vertices
+
+    def contains(self, points):
+        """Маска принадлежности точек (M, 2), граница считается внутренней"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        vertices = self.vertices
+        n = len(vertices)
+        if n < 3:
+            return np.zeros(len(points), dtype=bool)
+
+        rays = vertices - vertices[0]
+        px, py = points[:, 0] - vertices[0, 0], points[:, 1] - vertices[0, 1]
+
+        def side(k):
+            # >= 0 - точка не правее луча из вершины 0 в вершину k
+            return rays[k, 0] * py - rays[k, 1] * px
+
+        inside = (side(1) >= 0) & (side(n - 1) <= 0)
+        # Сектор: последний луч k, от которого точка не правее
+        lo, hi = np.ones(len(points), dtype=np.int64), np.full(len(points), n - 1)
+        while (hi - lo > 1).any():
+            middle = (lo + hi) // 2
+            left = side(middle) >= 0
+            narrowing = hi - lo > 1
+            lo = np.where(narrowing & left, middle, lo)
+            hi = np.where(narrowing & ~left, middle, hi)
+
+        a, b = vertices[lo], vertices[lo + 1]
+        edge_side = (b[:, 0] - a[:, 0]) * (points[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (points[:, 0] - a[:, 0])
+        return inside & (edge_side >= 0)
+
+
+def clip_polygons(polygons, window):
+    """Отсечение многих многоугольников одним выпуклым окном (Сазерленд - Ходжмен)
+
+    Каждая сторона окна отсекает сразу все вершины всех многоугольников - векторно, без цикла
+    по многоугольникам. Возвращает список массивов (K, 2); пустой массив - многоугольник вне окна.
+    Граница окна считается внутренней.
+    """
+    window = ConvexPolygon(window).vertices
+    points, owner, _ = polygon_rings(polygons)
+    count = len(polygons)
+    if len(window) < 3:
+        points, owner = points[:0], owner[:0]
+
+    for a, b in zip(window, np.roll(window, -1, axis=0)):
+        if not len(points):
+            break
+        following = next_vertex(owner, np.bincount(owner, minlength=count))
+        side = (b[0] - a[0]) * (points[:, 1] - a[1]) - (b[1] - a[1]) * (points[:, 0] - a[0])
+        inside = side >= 0
+        next_inside = inside[following]
+        crossing = inside != next_inside
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.where(crossing, side / (side - side[following]), 0)
+        crossing_points = points + t[:, None] * (points[following] - points)
+
+        # Ребро i -> i + 1 дает точку пересечения со стороной окна и конец ребра, если он внутри
+        candidates = np.stack([crossing_points, points[following]], axis=1).reshape(-1, 2)
+        keep = np.column_stack([crossing, next_inside]).ravel()
+        points, owner = candidates[keep], np.repeat(owner, 2)[keep]
+
+    # Вершина на стороне окна дает совпадающие соседние точки
+    points, owner, _ = polygon_rings(np.split(points, np.cumsum(np.bincount(owner, minlength=count))[:-1]))
+    sizes = np.bincount(owner, minlength=count)
+    return [ring if len(ring) >= 3 else ring[:0] for ring in np.split(points, np.cumsum(sizes)[:-1])]
+
+
+def signed_area(ring):
+    """Ориентированная площадь контура: > 0 при обходе против часовой стрелки"""
+    x, y = ring[:, 0], ring[:, 1]
+    return (np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))) / 2
+
+
+def edge_crossings(subject, clip):
+    """Пересечения ребер двух многоугольников - векторно по всем парам ребер, O(n * m) памяти
+
+    Возвращает (i, j, t, u): ребро subject, ребро clip и параметры точки на них, или None,
+    если ребра касаются в вершине или накладываются (вырожденный для Грейнера - Хормана случай).
+    """
+    r = np.roll(subject, -1, axis=0) - subject
+    s = np.roll(clip, -1, axis=0) - clip
+    qx = clip[None, :, 0] - subject[:, None, 0]
+    qy = clip[None, :, 1] - subject[:, None, 1]
+    rx, ry = r[:, None, 0], r[:, None, 1]
+    sx, sy = s[None, :, 0], s[None, :, 1]
+    denominator = rx * sy - ry * sx
+    u_numerator = qx * ry - qy * rx
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = (qx * sy - qy * sx) / denominator
+        u = u_numerator / denominator
+    closed = (denominator != 0) & (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)
+    proper = closed & (t > 0) & (t < 1) & (u > 0) & (u < 1)
+
+    # Параллельные ребра на одной прямой с общим участком
+    length = rx ** 2 + ry ** 2
+    start = (qx * rx + qy * ry) / length
+    end = start + (sx * rx + sy * ry) / length
+    overlap = ((denominator == 0) & (u_numerator == 0) &
+               (np.maximum(start, end) >= 0) & (np.minimum(start, end) <= 1))
+    if (closed & ~proper).any() or overlap.any():
+        return None
+
+    i, j = np.nonzero(proper)
+    return i, j, t[i, j], u[i, j]
+
+
+def polygon_boolean(subject, clip, operation=BooleanOperation.INTERSECTION):
+    """Пересечение, объединение или разность subject - clip произвольных многоугольников (Грейнер - Хорман)
+
+    Возвращает список контуров (K, 2). Касания в вершинах и общие ребра метод не различает, поэтому clip
+    сдвигается на BOOLEAN_PERTURBATION от размаха координат, пока вырождение не исчезнет. Если clip лежит
+    строго внутри subject, разность - два контура: второй, с обратным обходом, - дырка.
+    """
+    operation = BooleanOperation(operation)
+    subject = polygon_rings([subject])[0]
+    clip = polygon_rings([clip])[0]
+    if len(subject) < 3 or len(clip) < 3:
+        rings = {BooleanOperation.INTERSECTION: [],
+                 BooleanOperation.UNION: [subject, clip],
+                 BooleanOperation.DIFFERENCE: [subject]}[operation]
+        return [ring for ring in rings if len(ring) >= 3]
+
+    scale = 1 + max(np.abs(subject).max(), np.abs(clip).max())
+    hits = edge_crossings(subject, clip)
+    for attempt in range(1, BOOLEAN_PERTURB_ATTEMPTS + 1):
+        if hits is not None:
+            break
+        clip = clip + scale * BOOLEAN_PERTURBATION * attempt * np.array([1.0, 0.618034])
+        hits = edge_crossings(subject, clip)
+    if hits is None:
+        raise ValueError("Не удалось устранить вырожденные пересечения многоугольников")
+
+    subject_in_clip = points_in_polygon(subject[:1], clip)[0]
+    clip_in_subject = points_in_polygon(clip[:1], subject)[0]
+    i, j, t, u = hits
+    count = len(i)
+    if not count:
+        # Контуры не пересекаются: один внутри другого или они раздельны
+        hole = clip if np.sign(signed_area(clip)) != np.sign(signed_area(subject)) else clip[::-1]
+        if operation == BooleanOperation.INTERSECTION:
+            return [subject] if subject_in_clip else [clip] if clip_in_subject else []
+        if operation == BooleanOperation.UNION:
+            return [clip] if subject_in_clip else [subject] if clip_in_subject else [subject, clip]
+        return [] if subject_in_clip else [subject, hole] if clip_in_subject else [subject]
+
+    crossings = subject[i] + t[:, None] * (np.roll(subject, -1, axis=0)[i] - subject[i])
+
+    def chain(vertices, edge, parameter):
+        # Вершины и точки пересечения в порядке обхода; у пересечения - его номер, у вершины - -1
+        n = len(vertices)
+        order = np.lexsort((np.concatenate([np.full(n, -1.0), parameter]),
+                            np.concatenate([np.arange(n), edge])))
+        ids = np.concatenate([np.full(n, -1), np.arange(count)])[order]
+        return np.concatenate([vertices, crossings])[order], ids
+
+    # Пересечения на каждом контуре чередуются: вход в другой многоугольник, выход из него. Флаг
+    # «вход» задает направление обхода; объединение и разность переворачивают его у нужных контуров
+    forward = {BooleanOperation.INTERSECTION: (True, True),
+               BooleanOperation.UNION: (False, False),
+               BooleanOperation.DIFFERENCE: (False, True)}[operation]
+    chains, positions, entries = [], [], []
+    for (vertices, edge, parameter), first_inside, direction in zip(
+            ((subject, i, t), (clip, j, u)), (subject_in_clip, clip_in_subject), forward):
+        coords, ids = chain(vertices, edge, parameter)
+        along = ids[ids >= 0]
+        position, entry = np.empty(count, dtype=np.int64), np.empty(count, dtype=bool)
+        position[along] = np.flatnonzero(ids >= 0)
+        entry[along] = (direction != first_inside) != (np.arange(count) % 2 == 1)
+        chains.append((coords, ids))
+        positions.append(position)
+        entries.append(entry)
+
+    # Обход: от пересечения по текущему контуру до следующего пересечения, там - переход на другой контур
+    visited = np.zeros(count, dtype=bool)
+    rings = []
+    for start in range(count):
+        if visited[start]:
+            continue
+        ring, crossing, side = [], start, 0
+        while not visited[crossing]:
+            visited[crossing] = True
+            coords, ids = chains[side]
+            position = positions[side][crossing]
+            step = 1 if entries[side][crossing] else -1
+            ring.append(coords[position])
+            position = (position + step) % len(ids)
+            while ids[position] < 0:
+                ring.append(coords[position])
+                position = (position + step) % len(ids)
+            crossing, side = ids[position], 1 - side
+        rings.append(np.array(ring))
+    return rings
+
+
+class BoxTree:
+    """R-дерево габаритов многоугольников, упакованное методом STR, в массивах NumPy
+
+    Узлы уровня лежат подряд, дети узла - непрерывный отрезок следующего уровня, поэтому запрос
+    спускается по уровням сразу для всех подходящих узлов. Добавленные и измененные габариты до
+    перепаковки лежат в pending и проверяются перебором.
+    """
+
+    def __init__(self, node_size=RTREE_NODE_SIZE):
+        self.node_size = node_size
+        self.boxes = np.empty((16, 4))  # Габарит каждого многоугольника: xmin, ymin, xmax, ymax
+        self.count = 0
+        self.levels = []  # От корня: (габариты узлов, первый ребенок, число детей)
+        self.leaf_ids = np.empty(0, dtype=np.int64)  # Многоугольники в порядке листьев
+        self.pending = set()
+
+    def __len__(self):
+        return self.count
+
+    def set(self, index, points):
+        """Обновляет габарит многоугольника index; index == len(tree) добавляет новый"""
+        if index == self.count:
+            if self.count == len(self.boxes):
+                self.boxes = np.concatenate([self.boxes, np.empty_like(self.boxes)])
+            self.count += 1
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        # У пустого многоугольника габарит "вывернут" и ни с чем не пересекается
+        self.boxes[index] = [*points.min(axis=0), *points.max(axis=0)] if len(points) else [inf, inf, -inf, -inf]
+        self.pending.add(index)
+        if len(self.pending) > max(RTREE_PENDING_LIMIT, self.count // 8):
+            self.rebuild()
+
+    def clear(self):
+        self.count = 0
+        self.levels = []
+        self.leaf_ids = np.empty(0, dtype=np.int64)
+        self.pending.clear()
+
+    def str_order(self, boxes):
+        # Sort-Tile-Recursive: вертикальные полосы по центру x, внутри полосы - по центру y
+        center_x, center_y = boxes[:, 0] + boxes[:, 2], boxes[:, 1] + boxes[:, 3]
+        slices = int(np.ceil(np.sqrt(np.ceil(len(boxes) / self.node_size))))
+        by_x = np.argsort(center_x, kind='stable')
+        tile = np.arange(len(boxes)) // (slices * self.node_size)
+        return by_x[np.lexsort((center_y[by_x], tile))]
+
+    def pack(self, boxes):
+        # Узлы из node_size подряд идущих элементов
+        starts = np.arange(0, len(boxes), self.node_size)
+        counts = np.minimum(self.node_size, len(boxes) - starts)
+        nodes = np.column_stack([np.minimum.reduceat(boxes[:, 0], starts), np.minimum.reduceat(boxes[:, 1], starts),
+                                 np.maximum.reduceat(boxes[:, 2], starts), np.maximum.reduceat(boxes[:, 3], starts)])
+        return nodes, starts, counts
+
+    def rebuild(self):
+        boxes = self.boxes[:self.count]
+        ids = np.flatnonzero(boxes[:, 0] <= boxes[:, 2])
+        self.pending.clear()
+        self.levels = []
+        self.leaf_ids = ids[self.str_order(boxes[ids])]
+        if not len(ids):
+            return
+
+        level = self.pack(boxes[self.leaf_ids])
+        self.levels.append(level)
+        while len(level[0]) > 1:
+            order = self.str_order(level[0])
+            self.levels[-1] = tuple(array[order] for array in level)
+            level = self.pack(self.levels[-1][0])
+            self.levels.append(level)
+        self.levels.reverse()
+
+    def query(self, xmin, ymin, xmax, ymax):
+        """Индексы многоугольников, габарит которых пересекает прямоугольник, по возрастанию"""
+        def overlaps(boxes):
+            return (boxes[:, 0] <= xmax) & (boxes[:, 2] >= xmin) & (boxes[:, 1] <= ymax) & (boxes[:, 3] >= ymin)
+
+        nodes = np.zeros(1 if self.levels else 0, dtype=np.int64)
+        for boxes, starts, counts in self.levels:
+            nodes = nodes[overlaps(boxes[nodes])]
+            nodes = index_ranges(starts[nodes], counts[nodes])
+        candidates = np.concatenate([self.leaf_ids[nodes], np.fromiter(self.pending, dtype=np.int64)])
+        # Габариты в дереве могли устареть - окончательная проверка по текущим
+        candidates = np.unique(candidates)
+        return candidates[overlaps(self.boxes[candidates])]
+
+
+def benchmark_points(distribution, n, rng):
+    """Целые точки для замеров: равномерно в квадрате, на окружности или в гауссовых скоплениях
+
+    large - равномерно в квадрате с размахом больше SAFE_INT_SPAN: проверка точной арифметики.
+    """
+    scale = 10 ** 6
+    if distribution == 'uniform':
+        return rng.integers(0, scale, (n, 2))
+    if distribution == 'large':
+        return rng.integers(-10 ** 12, 10 ** 12, (n, 2))
+    if distribution == 'circle':
+        angles = rng.uniform(0, 2 * np.pi, n)
+        return np.rint(np.column_stack([np.cos(angles), np.sin(angles)]) * scale).astype(np.int64)
+    centers = rng.integers(0, scale, (10, 2))
+    return np.rint(centers[rng.integers(0, len(centers), n)] + rng.normal(0, scale / 100, (n, 2))).astype(np.int64)
+
+
+def benchmark_hulls(sizes=BENCHMARK_SIZES, seed=0):
+    """Сравнение алгоритмов выпуклой оболочки; время в мс, h - число вершин оболочки
+
+    Результат каждого метода сверяется с reference_hull; расхождение отмечается (!).
+    """
+    rng = np.random.default_rng(seed)
+    print(f"{'распределение':<14}{'n':>9}{'h':>7}" + ''.join(f"{method.value:>16}" for method in HullMethod))
+    for distribution in ('uniform', 'circle', 'clustered', 'large'):
+        previous = {}
+        for index, n in enumerate(sizes):
+            points = benchmark_points(distribution, n, rng)
+            growth = sizes[index + 1] / n if index + 1 < len(sizes) else 1
+            reference, cells = reference_hull(points), []
+            for method in HullMethod:
+                if method not in previous and index > 0:
+                    cells.append('-')
+                    continue
+                start = time.perf_counter()
+                hull = HULL_ALGORITHMS[method](points)
+                elapsed = time.perf_counter() - start
+                # Прогноз: рост не медленнее линейного, а для O(nh) - как на прошлом шаге
+                predicted = elapsed * max(growth, elapsed / previous.get(method, elapsed))
+                if predicted > BENCHMARK_TIME_LIMIT:
+                    previous.pop(method, None)
+                else:
+                    previous[method] = elapsed
+                cells.append(f"{elapsed * 1000:.1f}" + ('' if hull == reference else ' (!)'))
+            print(f"{distribution:<14}{n:>9}{len(reference):>7}" + ''.join(f"{cell:>16}" for cell in cells))
+
+
 class PolygonEditor:
     def __init__(self, root):
         self.root = root
@@ -36,10 +1126,24 @@ class PolygonEditor:
 
         self.algorithm = tk.StringVar(value=Algorithm.CDA.value)
         self.debug_mode = tk.BooleanVar(value=False)
+        self.editing = tk.BooleanVar(value=False)  # Перетаскивание вершин вместо добавления точек
         self.polygons = []
         self.current_polygon = []
         self.selected_point = None
-        self.hull_method = tk.StringVar(value=HullMethod.GRAHAM.value)
+        self.point_index = SpatialHash()  # (индекс полигона, индекс точки) -> координаты
+        self.hull_method = tk.StringVar(value=HullMethod.MONOTONE_CHAIN.value)
+        self.boolean_operation = tk.StringVar(value=BooleanOperation.INTERSECTION.value)
+        self.hull = DynamicHull()  # Обновляется при каждом добавлении точки
+        self.show_hull = False
+        self.edges = None  # PolygonEdges, сбрасывается при любом изменении полигонов
+        self.convex = {}  # Ключ полигона -> ConvexPolygon или None, сбрасывается при изменении полигона
+        self.slabs = {}  # Ключ невыпуклого полигона -> SlabIndex, сбрасывается вместе с convex
+        self.polygon_tree = BoxTree()  # Габариты завершенных полигонов; текущий проверяется всегда
+        # Элементы холста: у завершенного полигона - (id многоугольника или None, id вершин),
+        # у текущего - id вершин и отрезков (отрезок i соединяет вершины i и i + 1)
+        self.polygon_items = []
+        self.point_items = []
+        self.line_items = []
 
         self.build_ui()
         self.setup_bindings()
@@ -61,6 +1165,7 @@ class PolygonEditor:
         ttk.Button(toolbar, text="Новый полигон", command=self.start_new_polygon).pack(side=tk.LEFT, padx=5)
         ttk.Button(toolbar, text="Замкнуть полигон", command=self.close_polygon).pack(side=tk.LEFT, padx=5)
         ttk.Checkbutton(toolbar, text="Отладка", variable=self.debug_mode).pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(toolbar, text="Редактирование", variable=self.editing).pack(side=tk.LEFT, padx=5)
 
         # Проверка полигона
         ttk.Button(toolbar, text="Проверить выпуклость", command=self.check_convexity).pack(side=tk.LEFT, padx=5)
@@ -75,6 +1180,15 @@ class PolygonEditor:
 
         # Дополнительные функции
         ttk.Button(toolbar, text="Пересечение с отрезком", command=self.intersect_with_line).pack(side=tk.LEFT, padx=5)
+        ttk.Button(toolbar, text="Самопересечения", command=self.find_self_intersections).pack(side=tk.LEFT, padx=5)
+
+        # Операции над полигонами
+        ttk.Label(toolbar, text="Операция:").pack(side=tk.LEFT, padx=5)
+        for operation in BooleanOperation:
+            ttk.Radiobutton(toolbar, text=operation.name, variable=self.boolean_operation,
+                            value=operation.value).pack(side=tk.LEFT)
+        ttk.Button(toolbar, text="Применить к двум последним", command=self.combine_last_polygons).pack(side=tk.LEFT, padx=5)
+        ttk.Button(toolbar, text="Отсечь последним", command=self.clip_by_last_polygon).pack(side=tk.LEFT, padx=5)
         ttk.Button(toolbar, text="Принадлежность точки", command=self.point_in_polygon).pack(side=tk.LEFT, padx=5)
         ttk.Button(toolbar, text="Очистить", command=self.clear_canvas).pack(side=tk.LEFT, padx=5)
 
@@ -90,19 +1204,39 @@ class PolygonEditor:
 
     def start_new_polygon(self):
         if self.current_polygon:
-            self.polygons.append(self.current_polygon.copy())
+            self.store_current_polygon()
         self.current_polygon = []
         self.status.config(text="Создание нового полигона: кликните для добавления точек")
 
     def close_polygon(self):
         if len(self.current_polygon) >= 3:
-            self.polygons.append(self.current_polygon.copy())
-            self.draw_polygon(self.current_polygon)
+            self.store_current_polygon()
             self.current_polygon = []
             self.status.config(text="Полигон замкнут. Готов к работе")
         else:
             messagebox.showerror("Ошибка", "Для замыкания полигона нужно минимум 3 точки")
 
+    def store_current_polygon(self):
+        # Точки текущего полигона (индекс -1) получают индекс нового завершенного полигона
+        poly_idx = len(self.polygons)
+        for i, (x, y) in enumerate(self.current_polygon):
+            self.point_index.remove((-1, i))
+            self.point_index.insert((poly_idx, i), x, y)
+        self.polygons.append(self.current_polygon.copy())
+        self.polygon_tree.set(poly_idx, self.current_polygon)
+        self.edges = None
+        self.convex.pop(-1, None)
+        self.slabs.pop(-1, None)
+
+        # Отрезки текущего полигона заменяются контуром под его вершинами
+        for item in self.line_items:
+            self.canvas.delete(item)
+        outline = self.draw_polygon(self.current_polygon)
+        if outline is not None:
+            self.canvas.tag_lower(outline, self.point_items[0])
+        self.polygon_items.append((outline, self.point_items))
+        self.point_items, self.line_items = [], []
+
     def on_click(self, event):
         x, y = event.x // CELL_SIZE, event.y // CELL_SIZE
 
@@ -112,10 +1246,16 @@ class PolygonEditor:
                 return
 
         self.current_polygon.append((x, y))
-        self.draw_point(x, y)
+        self.point_index.insert((-1, len(self.current_polygon) - 1), x, y)
+        self.edges = None
+        self.convex.pop(-1, None)
+        self.slabs.pop(-1, None)
+        self.point_items.append(self.draw_point(x, y))
+        if self.hull.insert(x, y) and self.show_hull:
+            self.draw_hull()
 
         if len(self.current_polygon) > 1:
-            self.draw_line(self.current_polygon[-2], self.current_polygon[-1])
+            self.line_items.append(self.draw_line(self.current_polygon[-2], self.current_polygon[-1]))
 
         self.status.config(text=f"Добавлена точка ({x}, {y}). Всего точек: {len(self.current_polygon)}")
 
@@ -126,12 +1266,27 @@ class PolygonEditor:
         x, y = event.x // CELL_SIZE, event.y // CELL_SIZE
         poly_idx, point_idx = self.selected_point
 
-        if poly_idx == -1:  # Текущий полигон
-            self.current_polygon[point_idx] = (x, y)
+        polygon = self.current_polygon if poly_idx == -1 else self.polygons[poly_idx]  # -1 - текущий полигон
+        old = polygon[point_idx]
+        polygon[point_idx] = (x, y)
+        self.point_index.move(self.selected_point, x, y)
+        self.edges = None
+        self.convex.pop(poly_idx, None)
+        self.slabs.pop(poly_idx, None)
+        if poly_idx != -1:
+            self.polygon_tree.set(poly_idx, polygon)
+
+        # Оболочка меняется непредсказуемо, только если сдвинута ее вершина
+        if self.hull.is_vertex(*old):
+            self.hull = DynamicHull(monotone_chain(self.all_points()))
         else:
-            self.polygons[poly_idx][point_idx] = (x, y)
+            self.hull.insert(x, y)
 
-        self.redraw_all()
+        # Перерисовываются только элементы сдвинутой вершины; результаты проверок устарели
+        self.canvas.delete('normals', 'intersection', 'point_check', 'boolean')
+        self.update_vertex_items(poly_idx, point_idx)
+        if self.show_hull:
+            self.draw_hull()
 
     def on_release(self, event):
         self.selected_point = None
@@ -140,25 +1295,15 @@ class PolygonEditor:
         pass
 
     def edit_mode(self):
-        return False  # Можно добавить переключение режима редактирования
+        return self.editing.get()
 
     def find_nearest_point(self, x, y, threshold=1):
-        # Поиск в текущем полигоне
-        for i, (px, py) in enumerate(self.current_polygon):
-            if abs(px - x) <= threshold and abs(py - y) <= threshold:
-                return (-1, i)  # -1 означает текущий полигон
-
-        # Поиск в завершенных полигонах
-        for poly_idx, polygon in enumerate(self.polygons):
-            for point_idx, (px, py) in enumerate(polygon):
-                if abs(px - x) <= threshold and abs(py - y) <= threshold:
-                    return (poly_idx, point_idx)
-
-        return None
+        # Возвращает (индекс полигона, индекс точки); -1 означает текущий полигон
+        return self.point_index.nearest(x, y, threshold)
 
     def draw_point(self, x, y, color='red', tags=None):
-        size = 3
-        self.canvas.create_oval(
+        size = POINT_RADIUS
+        return self.canvas.create_oval(
             (x * CELL_SIZE) - size, (y * CELL_SIZE) - size,
             (x * CELL_SIZE) + size, (y * CELL_SIZE) + size,
             fill=color, outline=color, tags=tags
@@ -167,84 +1312,88 @@ class PolygonEditor:
     def draw_line(self, p1, p2, color='black', dash=None, tags=None):
         x1, y1 = p1
         x2, y2 = p2
-        self.canvas.create_line(
+        return self.canvas.create_line(
             x1 * CELL_SIZE, y1 * CELL_SIZE,
             x2 * CELL_SIZE, y2 * CELL_SIZE,
             fill=color, dash=dash, tags=tags
         )
 
-    def draw_polygon(self, points, color='blue', fill='', width=2):
+    def all_points(self):
+        return [point for polygon in [self.current_polygon, *self.polygons] for point in polygon]
+
+    def draw_hull(self):
+        self.canvas.delete('hull')
+        self.draw_polygon(self.hull.vertices(), color='red', fill='', width=3, tags='hull')
+
+    def draw_polygon(self, points, color='blue', fill='', width=2, tags=None):
         scaled = []
         for x, y in points:
             scaled.extend([x * CELL_SIZE, y * CELL_SIZE])
 
         if len(points) >= 3:
-            self.canvas.create_polygon(
-                *scaled, outline=color, fill=fill, width=width
+            return self.canvas.create_polygon(
+                *scaled, outline=color, fill=fill, width=width, tags=tags
             )
+        return None
 
-    def redraw_all(self):
-        self.canvas.delete('all')
-        draw_grid(self.canvas)
-
-        # Рисуем завершенные полигоны
-        for polygon in self.polygons:
-            self.draw_polygon(polygon)
-            for point in polygon:
-                self.draw_point(*point)
-
-        # Рисуем текущий полигон
-        if self.current_polygon:
-            for i in range(len(self.current_polygon)):
-                self.draw_point(*self.current_polygon[i])
-                if i > 0:
-                    self.draw_line(self.current_polygon[i - 1], self.current_polygon[i])
+    def update_vertex_items(self, poly_idx, point_idx):
+        # Сдвигает на холсте вершину и ее ребра: контур завершенного полигона или два отрезка текущего
+        size = POINT_RADIUS
+        if poly_idx == -1:
+            polygon, outline, points = self.current_polygon, None, self.point_items
+        else:
+            polygon = self.polygons[poly_idx]
+            outline, points = self.polygon_items[poly_idx]
+
+        x, y = polygon[point_idx]
+        self.canvas.coords(points[point_idx], x * CELL_SIZE - size, y * CELL_SIZE - size,
+                           x * CELL_SIZE + size, y * CELL_SIZE + size)
+        if outline is not None:
+            self.canvas.coords(outline, *[c * CELL_SIZE for point in polygon for c in point])
+        if poly_idx == -1:
+            for i in (point_idx - 1, point_idx):
+                if 0 <= i < len(self.line_items):
+                    (x1, y1), (x2, y2) = polygon[i], polygon[i + 1]
+                    self.canvas.coords(self.line_items[i], x1 * CELL_SIZE, y1 * CELL_SIZE,
+                                       x2 * CELL_SIZE, y2 * CELL_SIZE)
+
+    def polygons_to_check(self):
+        # (ключ, полигон): ключ - индекс завершенного полигона или -1 для текущего
+        polygons = list(enumerate(self.polygons))
+        if self.current_polygon and len(self.current_polygon) >= 3:
+            polygons.append((-1, self.current_polygon))
+        return polygons
+
+    def update_convexity(self, polygons):
+        is_convex = polygons_convexity([polygon for _, polygon in polygons])
+        for (key, polygon), convex in zip(polygons, is_convex):
+            self.convex[key] = ConvexPolygon(polygon) if convex else None
+
+    def convex_polygon(self, key, polygon):
+        # ConvexPolygon или None для невыпуклого полигона; кэш сбрасывается при изменении полигона
+        if key not in self.convex:
+            self.update_convexity([(key, polygon)])
+        return self.convex[key]
+
+    def slab_index(self, key, polygon):
+        # Строится при первой проверке точки и хранится до изменения полигона
+        if key not in self.slabs:
+            self.slabs[key] = SlabIndex(polygon)
+        return self.slabs[key]
 
     def check_convexity(self):
         if not self.current_polygon and not self.polygons:
             messagebox.showerror("Ошибка", "Нет полигонов для проверки")
             return
 
-        polygons_to_check = self.polygons.copy()
-        if self.current_polygon and len(self.current_polygon) >= 3:
-            polygons_to_check.append(self.current_polygon)
+        polygons = [(number, key, polygon) for number, (key, polygon) in enumerate(self.polygons_to_check(), 1)
+                    if len(polygon) >= 3]
+        self.update_convexity([(key, polygon) for _, key, polygon in polygons if key not in self.convex])
 
-        for i, polygon in enumerate(polygons_to_check):
-            if len(polygon) < 3:
-                continue
-
-            is_convex = True
-            n = len(polygon)
-            prev_cross = 0
-
-            for i in range(n):
-                p0 = polygon[i]
-                p1 = polygon[(i + 1) % n]
-                p2 = polygon[(i + 2) % n]
-
-                # Векторы между точками
-                dx1 = p1[0] - p0[0]
-                dy1 = p1[1] - p0[1]
-                dx2 = p2[0] - p1[0]
-                dy2 = p2[1] - p1[1]
-
-                # Векторное произведение
-                cross = dx1 * dy2 - dy1 * dx2
-
-                if abs(cross) < 1e-10:  # Коллинеарные точки
-                    continue
-
-                if prev_cross == 0:
-                    prev_cross = cross
-                else:
-                    if cross * prev_cross < 0:
-                        is_convex = False
-                        break
-
-            if is_convex:
-                messagebox.showinfo("Результат", f"Полигон {i + 1} выпуклый")
-            else:
-                messagebox.showinfo("Результат", f"Полигон {i + 1} невыпуклый")
+        convex = [str(number) for number, key, _ in polygons if self.convex[key] is not None]
+        concave = [str(number) for number, key, _ in polygons if self.convex[key] is None]
+        messagebox.showinfo("Результат", f"Выпуклые полигоны: {', '.join(convex) or 'нет'}\n"
+                                         f"Невыпуклые полигоны: {', '.join(concave) or 'нет'}")
 
     def find_normals(self):
         if not self.current_polygon and not self.polygons:
@@ -298,68 +1447,36 @@ class PolygonEditor:
             messagebox.showerror("Ошибка", "Нет точек для построения оболочки")
             return
 
-        points = []
-        if self.current_polygon:
-            points.extend(self.current_polygon)
-        for polygon in self.polygons:
-            points.extend(polygon)
-
+        points = self.hull_points()
         if len(points) < 3:
             messagebox.showerror("Ошибка", "Нужно минимум 3 точки для построения оболочки")
             return
 
         method = self.hull_method.get()
-        if method == HullMethod.GRAHAM.value:
-            hull = self.graham_scan(points)
-        else:
-            hull = self.jarvis_march(points)
+        hull = HULL_ALGORITHMS[HullMethod(method)](points)
 
-        # Рисуем оболочку
-        self.canvas.delete('hull')
-        self.draw_polygon(hull, color='red', fill='', width=3, tags='hull')
+        # Дальше оболочка достраивается при добавлении точек и рисуется после каждого изменения
+        self.hull = DynamicHull(hull)
+        self.show_hull = True
+        self.draw_hull()
 
         self.status.config(text=f"Построена выпуклая оболочка методом {method}")
 
-    def graham_scan(self, points):
-        # Находим точку с минимальной y-координатой (и минимальной x, если есть совпадения)
-        pivot = min(points, key=lambda p: (p[1], p[0]))
-
-        # Сортируем точки по полярному углу относительно pivot
-        sorted_points = sorted(points, key=lambda p: (atan2(p[1] - pivot[1], p[0] - pivot[0]), p[0]))
-
-        # Алгоритм Грэхема
-        hull = []
-        for p in sorted_points:
-            while len(hull) >= 2 and self.cross_product(hull[-2], hull[-1], p) <= 0:
-                hull.pop()
-            hull.append(p)
-
-        return hull
-
-    def jarvis_march(self, points):
-        # Находим самую левую точку
-        leftmost = min(points, key=lambda p: p[0])
-
-        hull = []
-        current = leftmost
-
-        while True:
-            hull.append(current)
-            next_point = points[0]
-
-            for candidate in points[1:]:
-                if next_point == current or self.cross_product(current, next_point, candidate) < 0:
-                    next_point = candidate
-
-            if next_point == leftmost:
-                break
-
-            current = next_point
-
-        return hull
-
-    def cross_product(self, a, b, c):
-        return (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+    def hull_points(self):
+        # Полигоны, чей габарит целиком внутри оболочки крайних по габаритам полигонов, вершин не добавят
+        boxes = self.polygon_tree.boxes[:len(self.polygon_tree)]
+        if len(boxes) <= 4:
+            return self.all_points()
+
+        extreme = {int(np.argmin(boxes[:, 0])), int(np.argmin(boxes[:, 1])),
+                   int(np.argmax(boxes[:, 2])), int(np.argmax(boxes[:, 3]))}
+        core = self.current_polygon + [point for i in extreme for point in self.polygons[i]]
+        core_hull = monotone_chain(core)
+        if len(core_hull) < 3:
+            return self.all_points()
+        corners = boxes[:, [0, 1, 0, 3, 2, 1, 2, 3]].reshape(-1, 2)
+        inside = ConvexPolygon(core_hull).contains(corners).reshape(-1, 4).all(axis=1)
+        return core + [point for i in np.flatnonzero(~inside) if i not in extreme for point in self.polygons[i]]
 
     def intersect_with_line(self):
         if not self.current_polygon and not self.polygons:
@@ -383,56 +1500,89 @@ class PolygonEditor:
             self.canvas.unbind('<Button-1>')
             self.find_intersections()
 
+    def polygon_edges(self):
+        if self.edges is None:
+            polygons_to_check = self.polygons.copy()
+            if self.current_polygon and len(self.current_polygon) >= 3:
+                polygons_to_check.append(self.current_polygon)
+            self.edges = PolygonEdges(polygons_to_check)
+        return self.edges
+
     def find_intersections(self):
         p1, p2 = self.line_points
-        intersections = []
-
-        polygons_to_check = self.polygons.copy()
+        # Ребра проверяются только у полигонов, чей габарит пересекает габарит отрезка
+        (x1, y1), (x2, y2) = p1, p2
+        candidates = self.polygon_tree.query(min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
         if self.current_polygon and len(self.current_polygon) >= 3:
-            polygons_to_check.append(self.current_polygon)
-
-        for polygon in polygons_to_check:
-            n = len(polygon)
-            for i in range(n):
-                p3 = polygon[i]
-                p4 = polygon[(i + 1) % n]
-
-                # Проверяем пересечение отрезков (p1,p2) и (p3,p4)
-                intersect, point = self.segment_intersection(p1, p2, p3, p4)
-                if intersect:
-                    intersections.append(point)
-                    self.draw_point(*point, color='orange', tags='intersection')
+            candidates = np.append(candidates, len(self.polygons))
+        intersections = self.polygon_edges().query(p1, p2, candidates)
+        for point in intersections:
+            self.draw_point(*point, color='orange', tags='intersection')
 
         # Рисуем отрезок
         self.draw_line(p1, p2, color='purple', tags='intersection')
 
-        if intersections:
+        if len(intersections):
             self.status.config(text=f"Найдено {len(intersections)} точек пересечения")
         else:
             self.status.config(text="Пересечений не найдено")
 
         del self.line_points
 
-    def segment_intersection(self, p1, p2, p3, p4):
-        x1, y1 = p1
-        x2, y2 = p2
-        x3, y3 = p3
-        x4, y4 = p4
+    def find_self_intersections(self):
+        # Пересечения ребер между собой: самопересечения полигонов и пересечения разных полигонов
+        edges = self.polygon_edges()
+        if not edges.segments:
+            messagebox.showerror("Ошибка", "Нет полигонов для проверки пересечения")
+            return
 
-        denom = (y4 - y3) * (x2 - x1) - (x4 - x3) * (y2 - y1)
+        self.canvas.delete('intersection')
+        crossings = edges.intersections()
+        polygons = set()
+        for point, ids in crossings:
+            self.draw_point(float(point[0]), float(point[1]), color='orange', tags='intersection')
+            polygons.update(edges.owners[i][0] + 1 for i in ids)
+
+        if crossings:
+            self.status.config(text=f"Найдено {len(crossings)} точек пересечения ребер, полигоны: "
+                                    f"{', '.join(map(str, sorted(polygons)))}")
+        else:
+            self.status.config(text="Ребра полигонов не пересекаются")
 
-        if denom == 0:  # Параллельны или коллинеарны
-            return False, None
+    def combine_last_polygons(self):
+        if len(self.polygons) < 2:
+            messagebox.showerror("Ошибка", "Нужно минимум два завершенных полигона")
+            return
 
-        ua = ((x4 - x3) * (y1 - y3) - (y4 - y3) * (x1 - x3)) / denom
-        ub = ((x2 - x1) * (y1 - y3) - (y2 - y1) * (x1 - x3)) / denom
+        self.canvas.delete('boolean')
+        operation = BooleanOperation(self.boolean_operation.get())
+        rings = polygon_boolean(self.polygons[-2], self.polygons[-1], operation)
+        for ring in rings:
+            self.draw_polygon(ring, color='green', width=3, tags='boolean')
+        self.status.config(text=f"{operation.name}: контуров - {len(rings)}")
+
+    def clip_by_last_polygon(self):
+        # Последний завершенный полигон - окно, остальные полигоны отсекаются им
+        if len(self.polygons) < 2:
+            messagebox.showerror("Ошибка", "Нужно окно (последний полигон) и хотя бы один полигон для отсечения")
+            return
 
-        if ua >= 0 and ua <= 1 and ub >= 0 and ub <= 1:
-            x = x1 + ua * (x2 - x1)
-            y = y1 + ua * (y2 - y1)
-            return True, (x, y)
+        self.canvas.delete('boolean')
+        window_idx = len(self.polygons) - 1
+        window = self.polygons[window_idx]
+        # Полигоны, чей габарит не пересекает габарит окна, целиком вне него
+        xs, ys = [x for x, _ in window], [y for _, y in window]
+        candidates = [int(i) for i in self.polygon_tree.query(min(xs), min(ys), max(xs), max(ys)) if i != window_idx]
 
-        return False, None
+        # Выпуклое окно отсекает все полигоны разом, невыпуклое - по одному
+        if self.convex_polygon(window_idx, window) is not None:
+            rings = clip_polygons([self.polygons[i] for i in candidates], window)
+        else:
+            rings = [ring for i in candidates for ring in polygon_boolean(self.polygons[i], window)]
+        rings = [ring for ring in rings if len(ring)]
+        for ring in rings:
+            self.draw_polygon(ring, color='green', width=3, tags='boolean')
+        self.status.config(text=f"Отсечено полигонов: {len(candidates)}, видимых контуров: {len(rings)}")
 
     def point_in_polygon(self):
         if not self.current_polygon and not self.polygons:
@@ -446,16 +1596,22 @@ class PolygonEditor:
         x, y = event.x // CELL_SIZE, event.y // CELL_SIZE
         point = (x, y)
 
-        polygons_to_check = self.polygons.copy()
-        if self.current_polygon and len(self.current_polygon) >= 3:
-            polygons_to_check.append(self.current_polygon)
-
         self.canvas.unbind('<Button-1>')
         self.draw_point(x, y, color='magenta', tags='point_check')
 
+        # Кандидаты - полигоны, чей габарит содержит точку, и текущий полигон
+        candidates = [(int(i), self.polygons[i]) for i in self.polygon_tree.query(x, y, x, y)]
+        if self.current_polygon and len(self.current_polygon) >= 3:
+            candidates.append((-1, self.current_polygon))
+
         inside_any = False
-        for i, polygon in enumerate(polygons_to_check):
-            if self.is_point_in_polygon(point, polygon):
+        for key, polygon in candidates:
+            i = len(self.polygons) if key == -1 else key
+            # Выпуклый полигон проверяется веером, остальные - индексом полос; оба за O(log n)
+            locator = self.convex_polygon(key, polygon)
+            if locator is None:
+                locator = self.slab_index(key, polygon)
+            if locator.contains([point])[0]:
                 inside_any = True
                 self.status.config(text=f"Точка ({x}, {y}) внутри полигона {i + 1}")
                 break
@@ -463,52 +1619,29 @@ class PolygonEditor:
         if not inside_any:
             self.status.config(text=f"Точка ({x}, {y}) не внутри ни одного полигона")
 
-    def is_point_in_polygon(self, point, polygon):
-        x, y = point
-        n = len(polygon)
-        inside = False
-
-        for i in range(n):
-            x1, y1 = polygon[i]
-            x2, y2 = polygon[(i + 1) % n]
-
-            # Проверяем, лежит ли точка на границе
-            if self.point_on_segment((x, y), (x1, y1), (x2, y2)):
-                return True
-
-            # Проверяем пересечение луча
-            if ((y1 > y) != (y2 > y)):
-                x_intersect = (y - y1) * (x2 - x1) / (y2 - y1) + x1
-                if x <= x_intersect:
-                    inside = not inside
-
-        return inside
-
-    def point_on_segment(self, p, p1, p2):
-        x, y = p
-        x1, y1 = p1
-        x2, y2 = p2
-
-        # Проверяем коллинеарность
-        cross = (x2 - x1) * (y - y1) - (y2 - y1) * (x - x1)
-        if abs(cross) > 1e-10:
-            return False
-
-        if min(x1, x2) <= x <= max(x1, x2) and min(y1, y2) <= y <= max(y1, y2):
-            return True
-
-        return False
-
     def clear_canvas(self):
         self.canvas.delete('all')
         self.polygons = []
         self.current_polygon = []
         self.selected_point = None
+        self.point_index.clear()
+        self.hull = DynamicHull()
+        self.show_hull = False
+        self.edges = None
+        self.convex.clear()
+        self.slabs.clear()
+        self.polygon_tree.clear()
+        self.polygon_items, self.point_items, self.line_items = [], [], []
         draw_grid(self.canvas)
         self.status.config(text="Холст очищен. Готов к работе")
 
 
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = PolygonEditor(root)
-    root.mainloop()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Графический редактор полигонов")
+    parser.add_argument('--benchmark', action='store_true', help="сравнить алгоритмы выпуклой оболочки и выйти")
+    if parser.parse_args().benchmark:
+        benchmark_hulls()
+    else:
+        root = tk.Tk()
+        app = PolygonEditor(root)
+        root.mainloop()
\ No newline at end of file
@@ -1,21 +1,20 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from math import atan2, sqrt, isclose
+from math import sqrt, isclose
 from enum import Enum
+import numpy as np
+from Laba3 import SpatialHash
 
 CELL_SIZE = 20
 CANVAS_WIDTH = 800
 CANVAS_HEIGHT = 600
+PIP_CHUNK = 1 << 20  # Пар точка - ребро в одном блоке векторной проверки принадлежности
 
 
 class Algorithm(Enum):
     CDA = "cda"
 
 
-class HullMethod(Enum):
-    GRAHAM = "graham"
-
-
 class FillAlgorithm(Enum):
     ORDERED_EDGE_LIST = "ordered_edge_list"
     ACTIVE_EDGE_LIST = "active_edge_list"
@@ -30,6 +29,122 @@ def draw_grid(canvas):
         canvas.create_line(0, y, CANVAS_WIDTH, y, fill='#ddd')
 
 
+def points_in_polygon(points, polygon):
+    """Принадлежность точек (M, 2) многоугольнику (N, 2) - маска (M,), граница считается внутренней
+
+    Тот же луч вправо, что и в is_point_in_polygon, но сразу для всех пар точка - ребро
+    (блоками не больше PIP_CHUNK пар).
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    polygon = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+    inside = np.zeros(len(points), dtype=bool)
+    if len(polygon) == 0:
+        return inside
+
+    x1, y1 = polygon[:, 0], polygon[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    chunk = max(1, PIP_CHUNK // len(polygon))
+    for start in range(0, len(points), chunk):
+        x = points[start:start + chunk, 0:1]
+        y = points[start:start + chunk, 1:2]
+        cross = (x2 - x1) * (y - y1) - (y2 - y1) * (x - x1)
+        on_edge = ((np.abs(cross) <= 1e-10) & (np.minimum(x1, x2) <= x) & (x <= np.maximum(x1, x2)) &
+                   (np.minimum(y1, y2) <= y) & (y <= np.maximum(y1, y2)))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            crossing = ((y1 > y) != (y2 > y)) & (x <= (y - y1) * (x2 - x1) / (y2 - y1) + x1)
+        inside[start:start + chunk] = on_edge.any(axis=1) | (np.count_nonzero(crossing, axis=1) % 2 == 1)
+    return inside
+
+
+class SlabIndex:
+    """Разбиение многоугольника горизонталями через вершины для проверки точек за O(log n)
+
+    В полосе ys[k] <= y < ys[k + 1] нет вершин, и ребра, пересекающие ее, упорядочены по x: четность числа
+    ребер правее точки находится двоичным поиском (сразу для всех точек запроса). Полосы, где ребра
+    пересекаются (многоугольник с самопересечениями), проверяются перебором через points_in_polygon.
+    Память - O(n^2) в худшем случае, для обычных многоугольников близко к O(n).
+    """
+
+    def __init__(self, polygon):
+        self.polygon = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+        x1, y1 = self.polygon[:, 0], self.polygon[:, 1]
+        x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+        self.ys = np.unique(y1)
+        self.vertices = x1 + 1j * y1
+
+        # Горизонтальные ребра не попадают ни в одну полосу - для них отдельная проверка границы
+        flat = y1 == y2
+        self.flat_y = y1[flat]
+        self.flat_x0, self.flat_x1 = np.minimum(x1, x2)[flat], np.maximum(x1, x2)[flat]
+
+        # Ребро занимает полосы с first по last - 1
+        sloped = np.flatnonzero(~flat)
+        first = np.searchsorted(self.ys, np.minimum(y1, y2)[sloped])
+        last = np.searchsorted(self.ys, np.maximum(y1, y2)[sloped])
+        counts = last - first
+        edges = np.repeat(sloped, counts)
+        slabs = np.repeat(first - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+
+        def x_at(y):
+            return x1[edges] + (y - y1[edges]) * (x2[edges] - x1[edges]) / (y2[edges] - y1[edges])
+
+        bottom, top = self.ys[slabs], self.ys[np.minimum(slabs + 1, len(self.ys) - 1)]
+        order = np.lexsort((x_at((bottom + top) / 2), slabs))
+        edges, slabs, bottom, top = edges[order], slabs[order], bottom[order], top[order]
+        self.x1, self.y1, self.x2, self.y2 = x1[edges], y1[edges], x2[edges], y2[edges]
+        self.offsets = np.searchsorted(slabs, np.arange(len(self.ys) + 1))
+
+        # Порядок по x внутри полосы должен сохраняться и на ее границах (допуск - на общие вершины)
+        low, high = x_at(bottom), x_at(top)
+        tolerance = 1e-9 * (1 + np.abs(low[1:]) + np.abs(high[1:]))
+        tangled = (slabs[1:] == slabs[:-1]) & ((low[1:] < low[:-1] - tolerance) | (high[1:] < high[:-1] - tolerance))
+        self.tangled = np.zeros(len(self.ys), dtype=bool)
+        self.tangled[slabs[1:][tangled]] = True
+
+    def contains(self, points):
+        """Маска принадлежности точек (M, 2) многоугольнику, совпадает с points_in_polygon"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        x, y = points[:, 0], points[:, 1]
+        inside = np.isin(x + 1j * y, self.vertices)
+        on_flat = np.flatnonzero(np.isin(y, self.flat_y))
+        if len(on_flat):
+            px, py = x[on_flat, None], y[on_flat, None]
+            inside[on_flat] |= ((py == self.flat_y) & (self.flat_x0 <= px) & (px <= self.flat_x1)).any(axis=1)
+
+        slab = np.searchsorted(self.ys, y, side='right') - 1
+        valid = (slab >= 0) & (slab < len(self.ys) - 1)
+        tangled = np.zeros(len(points), dtype=bool)
+        tangled[valid] = self.tangled[slab[valid]]
+        inside[tangled] |= points_in_polygon(points[tangled], self.polygon)
+
+        # Двоичный поиск первого ребра полосы с x пересечения >= x точки, сразу для всех точек
+        query = np.flatnonzero(valid & ~tangled)
+        qx, qy = x[query], y[query]
+        start, end = self.offsets[slab[query]], self.offsets[slab[query] + 1]
+        lo, hi = start.copy(), end.copy()
+        while True:
+            active = lo < hi
+            if not active.any():
+                break
+            middle = np.minimum((lo + hi) // 2, len(self.x1) - 1)
+            x_cross = (qy - self.y1[middle]) * (self.x2[middle] - self.x1[middle]) / (self.y2[middle] - self.y1[middle])
+            right = active & (x_cross + self.x1[middle] < qx)
+            lo = np.where(right, middle + 1, lo)
+            hi = np.where(active & ~right, middle, hi)
+        result = (end - lo) % 2 == 1
+
+        # Точка на ребре - это одно из двух ребер по сторонам от найденной позиции
+        for edge in (lo - 1, lo):
+            near = (edge >= start) & (edge < end)
+            edge = np.clip(edge, 0, max(len(self.x1) - 1, 0))[near]
+            ex1, ey1, ex2, ey2 = self.x1[edge], self.y1[edge], self.x2[edge], self.y2[edge]
+            cross = (ex2 - ex1) * (qy[near] - ey1) - (ey2 - ey1) * (qx[near] - ex1)
+            result[near] |= ((np.abs(cross) <= 1e-10) & (np.minimum(ex1, ex2) <= qx[near]) &
+                             (qx[near] <= np.maximum(ex1, ex2)))
+        inside[query] |= result
+        return inside
+
+
 class PolygonEditor:
     def __init__(self, root):
         self.root = root
@@ -44,7 +159,7 @@ class PolygonEditor:
         self.polygons = []
         self.current_polygon = []
         self.selected_point = None
-        self.hull_method = tk.StringVar(value=HullMethod.GRAHAM.value)
+        self.point_index = SpatialHash()  # (индекс полигона, индекс точки) -> координаты
         self.fill_color = 'blue'
         self.debug_delay = 10  # Уменьшена задержка для отладки
 
@@ -85,19 +200,27 @@ class PolygonEditor:
 
     def start_new_polygon(self):
         if self.current_polygon:
-            self.polygons.append(self.current_polygon.copy())
+            self.store_current_polygon()
         self.current_polygon = []
         self.status.config(text="Создание нового полигона: кликните для добавления точек")
 
     def close_polygon(self):
         if len(self.current_polygon) >= 3:
-            self.polygons.append(self.current_polygon.copy())
+            self.store_current_polygon()
             self.draw_polygon(self.current_polygon)
             self.current_polygon = []
             self.status.config(text="Полигон замкнут. Готов к работе")
         else:
             messagebox.showerror("Ошибка", "Для замыкания полигона нужно минимум 3 точки")
 
+    def store_current_polygon(self):
+        # Точки текущего полигона (индекс -1) получают индекс нового завершенного полигона
+        poly_idx = len(self.polygons)
+        for i, (x, y) in enumerate(self.current_polygon):
+            self.point_index.remove((-1, i))
+            self.point_index.insert((poly_idx, i), x, y)
+        self.polygons.append(self.current_polygon.copy())
+
     def on_click(self, event):
         x, y = event.x // CELL_SIZE, event.y // CELL_SIZE
 
@@ -107,6 +230,7 @@ class PolygonEditor:
                 return
 
         self.current_polygon.append((x, y))
+        self.point_index.insert((-1, len(self.current_polygon) - 1), x, y)
         self.draw_point(x, y)
 
         if len(self.current_polygon) > 1:
@@ -125,6 +249,7 @@ class PolygonEditor:
             self.current_polygon[point_idx] = (x, y)
         else:
             self.polygons[poly_idx][point_idx] = (x, y)
+        self.point_index.move(self.selected_point, x, y)
 
         self.redraw_all()
 
@@ -138,18 +263,8 @@ class PolygonEditor:
         return False  # Можно добавить переключение режима редактирования
 
     def find_nearest_point(self, x, y, threshold=1):
-        # Поиск в текущем полигоне
-        for i, (px, py) in enumerate(self.current_polygon):
-            if abs(px - x) <= threshold and abs(py - y) <= threshold:
-                return (-1, i)  # -1 означает текущий полигон
-
-        # Поиск в завершенных полигонах
-        for poly_idx, polygon in enumerate(self.polygons):
-            for point_idx, (px, py) in enumerate(polygon):
-                if abs(px - x) <= threshold and abs(py - y) <= threshold:
-                    return (poly_idx, point_idx)
-
-        return None
+        # Возвращает (индекс полигона, индекс точки); -1 означает текущий полигон
+        return self.point_index.nearest(x, y, threshold)
 
     def draw_point(self, x, y, color='red', tags=None):
         size = 3
@@ -354,20 +469,32 @@ class PolygonEditor:
             for edge in active_edges:
                 edge['x'] += edge['dx']
 
+    def pixel_tester(self, polygon):
+        # Принадлежность пикселей габарита считается одним запросом к SlabIndex, дальше - поиск в маске
+        xs, ys = [p[0] for p in polygon], [p[1] for p in polygon]
+        x0, y0, x1, y1 = int(min(xs)), int(min(ys)), int(max(xs)), int(max(ys))
+        grid_x, grid_y = np.meshgrid(np.arange(x0, x1 + 1), np.arange(y0, y1 + 1))
+        mask = SlabIndex(polygon).contains(np.column_stack([grid_x.ravel(), grid_y.ravel()])).reshape(grid_x.shape)
+
+        def inside(x, y):
+            return x0 <= x <= x1 and y0 <= y <= y1 and bool(mask[y - y0, x - x0])
+        return inside
+
     def simple_seed_fill(self, polygon):
         scaled_polygon = [(x * CELL_SIZE, y * CELL_SIZE) for x, y in polygon]
 
         if polygon[0] != polygon[-1]:
             scaled_polygon.append(scaled_polygon[0])
+        inside = self.pixel_tester(scaled_polygon)
 
         cx = sum(p[0] for p in scaled_polygon) // len(scaled_polygon)
         cy = sum(p[1] for p in scaled_polygon) // len(scaled_polygon)
 
-        if not self.is_point_in_polygon((cx, cy), scaled_polygon):
+        if not inside(cx, cy):
             found = False
             for y in range(int(min(p[1] for p in scaled_polygon)), int(max(p[1] for p in scaled_polygon))):
                 for x in range(int(min(p[0] for p in scaled_polygon)), int(max(p[0] for p in scaled_polygon))):
-                    if self.is_point_in_polygon((x, y), scaled_polygon):
+                    if inside(x, y):
                         cx, cy = x, y
                         found = True
                         break
@@ -383,7 +510,7 @@ class PolygonEditor:
 
         while stack:
             x, y = stack.pop()
-            if (x, y) in filled or not self.is_point_in_polygon((x, y), scaled_polygon):
+            if (x, y) in filled or not inside(x, y):
                 continue
 
             self.draw_pixel(x, y, color=self.fill_color, tags='fill')
@@ -405,15 +532,16 @@ class PolygonEditor:
 
         if polygon[0] != polygon[-1]:
             scaled_polygon.append(scaled_polygon[0])
+        inside = self.pixel_tester(scaled_polygon)
 
         cx = sum(p[0] for p in scaled_polygon) // len(scaled_polygon)
         cy = sum(p[1] for p in scaled_polygon) // len(scaled_polygon)
 
-        if not self.is_point_in_polygon((cx, cy), scaled_polygon):
+        if not inside(cx, cy):
             found = False
             for y in range(int(min(p[1] for p in scaled_polygon)), int(max(p[1] for p in scaled_polygon))):
                 for x in range(int(min(p[0] for p in scaled_polygon)), int(max(p[0] for p in scaled_polygon))):
-                    if self.is_point_in_polygon((x, y), scaled_polygon):
+                    if inside(x, y):
                         cx, cy = x, y
                         found = True
                         break
@@ -433,12 +561,12 @@ class PolygonEditor:
                 continue
 
             left = x
-            while left >= 0 and self.is_point_in_polygon((left, y), scaled_polygon):
+            while left >= 0 and inside(left, y):
                 left -= 1
             left += 1
 
             right = x
-            while self.is_point_in_polygon((right, y), scaled_polygon):
+            while inside(right, y):
                 right += 1
             right -= 1
 
@@ -457,35 +585,15 @@ class PolygonEditor:
                 px = left
                 while px <= right:
                     while px <= right and (
-                            (px, new_y) in filled or not self.is_point_in_polygon((px, new_y), scaled_polygon)):
+                            (px, new_y) in filled or not inside(px, new_y)):
                         px += 1
                     if px <= right:
                         seed = px
-                        while px <= right and (px, new_y) not in filled and self.is_point_in_polygon((px, new_y),
-                                                                                                     scaled_polygon):
+                        while px <= right and (px, new_y) not in filled and inside(px, new_y):
                             px += 1
                         stack.append((seed, new_y))
                     px += 1
 
-    def graham_scan(self, points):
-        # Находим точку с минимальной y-координатой (и минимальной x, если есть совпадения)
-        pivot = min(points, key=lambda p: (p[1], p[0]))
-
-        # Сортируем точки по полярному углу относительно pivot
-        sorted_points = sorted(points, key=lambda p: (atan2(p[1] - pivot[1], p[0] - pivot[0]), p[0]))
-
-        # Алгоритм Грэхема
-        hull = []
-        for p in sorted_points:
-            while len(hull) >= 2 and self.cross_product(hull[-2], hull[-1], p) <= 0:
-                hull.pop()
-            hull.append(p)
-
-        return hull
-
-    def cross_product(self, a, b, c):
-        return (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
-
     def is_point_in_polygon(self, point, polygon):
         x, y = point
         n = len(polygon)
@@ -527,6 +635,7 @@ class PolygonEditor:
         self.polygons = []
         self.current_polygon = []
         self.selected_point = None
+        self.point_index.clear()
         draw_grid(self.canvas)
         self.status.config(text="Холст очищен. Готов к работе")
 